@@ -0,0 +1,204 @@
+"""
+Benchmark every stage of generating the FIGfonts, and loading/rendering them.
+
+Every stage reports the wall time (the best of `--repeat` runs), the peak memory (by tracemalloc,
+in a separate run) and the output bytes. The results can be saved as JSON and compared with a
+baseline, the exit code is 1 if any stage is slower (or uses more memory) than the threshold,
+and by more than a small absolute floor (so the timer noise of the fast stages isn't a regression).
+
+    python bench.py -o results.json
+    python bench.py --baseline results.json --threshold 0.2
+
+The source code is licensed under GPL2.0. See LICENSE.txt.
+"""
+import gc
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from os import path
+
+import generate
+import render
+
+RENDER_TEXT = "你好，世界！Hello, world. 中文字体测试"
+
+
+def measure(func, repeat:int=3) -> dict:
+    """
+    Run `func()` `repeat` times for the time, and once more with tracemalloc for the peak memory.
+
+    :param func: Returns the output bytes of the stage (or `None`).
+    :return: `{"seconds", "peak_bytes", "output_bytes"}`
+    :rtype: dict
+    """
+    seconds = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        output_bytes = func()
+        seconds = min(seconds, time.perf_counter() - start)
+    gc.collect()
+    tracemalloc.start()
+    func()
+    peak_bytes = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"seconds": seconds, "peak_bytes": peak_bytes, "output_bytes": output_bytes or 0}
+
+
+def run_benchmarks(styles:list=None, ch_file:str=generate.INPUT_SP_CHINESE_CH_FILE, repeat:int=3,
+                   log=print) -> dict:
+    """
+    :param styles: The names in `generate.FONT_STYLES`. Default all.
+    :type styles: list
+    :param ch_file: The character file of the scope, see `generate.get_flf_scope_arr()`.
+    :type ch_file: str
+    :param repeat: How many times every stage runs.
+    :type repeat: int
+    :param log: Called with a line for every finished stage.
+    :return: `{stage name: measure() result}`
+    :rtype: dict
+    """
+    if(styles is None): styles = list(generate.FONT_STYLES)
+    results = {}
+    def bench(name:str, func):
+        results[name] = measure(func, repeat)
+        r = results[name]
+        log(f"{name:<40} {r['seconds']*1000:10.2f} ms {r['peak_bytes']/2**20:9.2f} MiB {r['output_bytes']:>10} B")
+
+    def bench_flf(stage:str, name:str, fig_font:generate.Figfont) -> str:
+        """Bench writing `fig_font` to `tmp_dir`, return the font file. The font isn't kept by a closure."""
+        output_flf = path.join(tmp_dir, generate.OUTPUT_PREFIX + name + ".flf")
+        def flf():
+            generate.generate_flf(output_flf, fig_font)
+            return path.getsize(output_flf)
+        bench(f"{stage}:{name}", flf)
+        return output_flf
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # hex parsing: build the offset index from scratch, then load the cached one
+        index_file = path.join(tmp_dir, "unifont.hex.idx")
+        def build_index():
+            if(path.exists(index_file)): os.remove(index_file)
+            font_source = generate.Unifont(generate.INPUT_FILE, index_file)
+            n = len(font_source); font_source.close()
+            return path.getsize(index_file) if n else 0
+        def load_index():
+            font_source = generate.Unifont(generate.INPUT_FILE, index_file)
+            len(font_source); font_source.close()
+        bench("hex_index_build", build_index)
+        bench("hex_index_load", load_index)
+
+        font_source = generate.Unifont(generate.INPUT_FILE, index_file)
+        flf_scope_arr = generate.get_flf_scope_arr(ch_file)
+        bin_dic = generate.generate_bin_dic(flf_scope_arr, font_source)
+        bench("generate_bin_dic", lambda: len(generate.generate_bin_dic(flf_scope_arr, font_source).rows_arr.tobytes()))
+
+        # all the styles in one pass, sharing the intermediate forms of the glyphs
+        def all_styles():
+            fig_fonts = generate.Generator_figfont(bin_dic).generate_styles([generate.FONT_STYLES[name] for name in styles])
+            return sum(len(line) for fig_font in fig_fonts for lines in fig_font.font_dic.values() for line in lines)
+        bench("generate_styles", all_styles)
+
+        for name in styles:
+            func_name, kwargs = generate.FONT_STYLES[name]
+            def style():
+                fig_font = getattr(generate.Generator_figfont(bin_dic), func_name)(**kwargs)
+                return sum(len(line) for lines in fig_font.font_dic.values() for line in lines)
+            bench(f"style:{name}", style)
+            fig_font = getattr(generate.Generator_figfont(bin_dic), func_name)(**kwargs)
+            output_flf = bench_flf("generate_flf", name, fig_font)
+            del fig_font
+            # the in-process renderer from a cold cache, see render.py
+            bench(f"render:{name}", lambda: len(render.Renderer(name, flf_scope_arr, font_source)
+                                                .render_text(RENDER_TEXT, width=float("inf")).encode("utf-8")))
+            # the generated font: parsed whole, or memory-mapped and read by the codetag index
+            for stage, font_class in (("flf_render", render.FlfFont), ("mapped_render", render.MappedFlfFont)):
+                bench(f"{stage}:{name}", lambda: len(font_class(output_flf)
+                                                     .render_text(RENDER_TEXT, width=float("inf")).encode("utf-8")))
+
+        try:
+            import pyfiglet
+        except ImportError:
+            log("pyfiglet isn't installed, skip the font loading benchmarks")
+            pyfiglet = None
+        if(pyfiglet is not None):
+            for name in styles:
+                font = path.splitext(path.join(tmp_dir, generate.OUTPUT_PREFIX + name + ".flf"))[0]
+                bench(f"pyfiglet_load:{name}", lambda: pyfiglet.Figlet(font=font, width=float("inf")) and None)
+                figlet = pyfiglet.Figlet(font=font, width=float("inf"))
+                bench(f"pyfiglet_render:{name}", lambda: len(figlet.renderText(RENDER_TEXT).encode("utf-8")))
+        font_source.close()
+    return results
+
+
+MIN_DELTA = {"seconds": 0.002, "peak_bytes": 64 * 1024} # smaller growth is timer (or allocator) noise
+
+def compare(results:dict, baseline:dict, threshold:float=0.2, min_delta:dict=MIN_DELTA) -> list:
+    """
+    A stage regresses if it grows more than `threshold` and more than `min_delta`,\
+    so the sub-millisecond stages aren't flagged for the noise of the timer.
+
+    :param results: `{stage name: measure() result}`
+    :param baseline: The same as `results`, from an earlier run.
+    :param threshold: The allowed growth of time and peak memory, e.g. `0.2` for +20%.
+    :param min_delta: `{"seconds": ..., "peak_bytes": ...}`, the allowed absolute growth.
+    :return: `[(stage name, key, baseline value, value)]` of the regressions.
+    :rtype: list
+    """
+    regressions = []
+    for name, result in results.items():
+        if(name not in baseline): continue
+        for key in ("seconds", "peak_bytes"):
+            base_value = baseline[name][key]
+            if(base_value > 0 and result[key] > base_value * (1 + threshold) and result[key] - base_value > min_delta[key]):
+                regressions.append((name, key, base_value, result[key]))
+    return regressions
+
+
+def main(argv:list=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Benchmark generating, loading and rendering the FIGfonts.")
+    parser.add_argument("styles", nargs="*", metavar="STYLE",
+                        help=f"Styles to benchmark, default all. Choices: {', '.join(generate.FONT_STYLES)}")
+    parser.add_argument("-s", "--scope-file", default=generate.INPUT_SP_CHINESE_CH_FILE, help="Default: %(default)s")
+    parser.add_argument("-r", "--repeat", type=int, default=3, help="Runs of every stage, the best is kept. Default: %(default)s")
+    parser.add_argument("-o", "--output", default=None, help="Save the results as JSON")
+    parser.add_argument("-b", "--baseline", default=None, help="Compare with the results JSON of an earlier run")
+    parser.add_argument("-t", "--threshold", type=float, default=0.2,
+                        help="Allowed growth of time and peak memory against the baseline. Default: %(default)s")
+    parser.add_argument("--min-delta-ms", type=float, default=MIN_DELTA["seconds"] * 1000,
+                        help="Allowed absolute growth of time, in milliseconds. Default: %(default)s")
+    parser.add_argument("--min-delta-kib", type=float, default=MIN_DELTA["peak_bytes"] / 1024,
+                        help="Allowed absolute growth of peak memory, in KiB. Default: %(default)s")
+    args = parser.parse_args(argv)
+    for name in args.styles:
+        if(name not in generate.FONT_STYLES): parser.error(f"unknown style `{name}`")
+
+    print(f"{'stage':<40} {'time':>13} {'peak memory':>13} {'output':>12}")
+    results = run_benchmarks(args.styles or None, args.scope_file, args.repeat)
+    if(args.output is not None):
+        report = {
+            "unifont_version": generate.UNIFONT_VERSION,
+            "generator_version": generate.GENERATOR_VERSION,
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "results": results,
+        }
+        with open(args.output, "w", encoding="utf-8") as f: json.dump(report, f, indent=2)
+    if(args.baseline is not None):
+        with open(args.baseline, "r", encoding="utf-8") as f: baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold,
+                              {"seconds": args.min_delta_ms / 1000, "peak_bytes": args.min_delta_kib * 1024})
+        for name, key, base_value, value in regressions:
+            print(f"REGRESSION {name} {key}: {base_value:.6g} -> {value:.6g} (+{(value/base_value - 1)*100:.1f}%)")
+        if(regressions): sys.exit(1)
+        print(f"No regression (threshold +{args.threshold*100:.0f}%) against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -20,15 +20,32 @@ The generated fonts are licensed under OFL1.1. See fig-fonts/LICENSE.txt.
     with this program; if not, write to the Free Software Foundation, Inc.,
     51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
 """
+import contextlib
+import functools
+import hashlib
+import io
+import itertools
 import json
+import mmap
+import os
+import pickle
+import struct
+import sys
+import time
 from os import path
+from array import array
+from bisect import bisect_left
+from collections import ChainMap, Counter, OrderedDict
+from collections.abc import Mapping
 from dataclasses import dataclass, field
 
 UNIFONT_VERSION = "17.0.03"
 CURRENT_DIR = path.dirname(path.abspath(__file__)) + "/" # ./
 INPUT_FILE = CURRENT_DIR + "assets/unifont/unifont.hex"
+INPUT_UPPER_FILE = CURRENT_DIR + "assets/unifont/unifont_upper.hex" # Planes 1-15, not included, see `open_unifont()`
 INPUT_SP_CHINESE_CH_FILE = CURRENT_DIR + "assets/level-1.txt" # 一级字, 3500 个
 OUTPUT_JSON = CURRENT_DIR + "assets/unifont/unifont.json"
+OUTPUT_STORE = CURRENT_DIR + "assets/unifont/unifont.glyphs"
 FLF_SCOPE_ARR = [
     #[0x0020, 0x007E], # Part of "Controls and basic latin". The necessary FIGfont
     #[0x4E00, 0x9FFF], # 基本汉字，太多了，不用，使用 INPUT_SP_CHINESE_CH_FILE 生成
@@ -41,86 +58,494 @@ FLF_SCOPE_ARR = [
     [0x2026, 0x2026] # …  省略号
 ]
 
-dic = {} # This dict is to store the hex file
-HEX2BIN = {"0":"0000", "1":"0001", "2":"0010", "3":"0011",
-    "4":"0100", "5":"0101", "6":"0110", "7":"0111",
-    "8":"1000", "9":"1001", "A":"1010", "B":"1011",
-    "C":"1100", "D":"1101", "E":"1110", "F":"1111"}
+## Get Simplified Chinese characters required to generate
+def read_scope_file(ch_file:str=INPUT_SP_CHINESE_CH_FILE) -> list:
+    """
+    Read a character file (one character per line) to a list of scopes.
+
+    :param ch_file: The character file, like `assets/level-1.txt`.
+    :type ch_file: str
+    :return: A list like `[[ch_code, ch_code], ...]`, see `FLF_SCOPE_ARR`.
+    :rtype: list
+    """
+    ret_arr = []
+    with open(ch_file, "r", encoding="utf-8") as f:
+        for ch in f:
+            ch = ch.replace("\n", "")
+            if(ch == ""): continue
+            ret_arr += [[ord(ch), ord(ch)]]
+    return ret_arr
 
 
-## Get Simplified Chinese characters required to generate
-for ch in open(INPUT_SP_CHINESE_CH_FILE, "r", encoding="utf-8"):
-    ch_code = ord(ch.replace("\n", ""))
-    FLF_SCOPE_ARR += [[ch_code, ch_code]]
-# FLF_SCOPE_ARR won't be changed anymore. So I regard it as an constant variable
+def get_flf_scope_arr(ch_file:str=INPUT_SP_CHINESE_CH_FILE) -> list:
+    """
+    `FLF_SCOPE_ARR` plus the characters in `ch_file`. The default scope to generate.
+
+    :param ch_file: The character file. See `read_scope_file()`.
+    :type ch_file: str
+    :rtype: list
+    """
+    return FLF_SCOPE_ARR + read_scope_file(ch_file)
+
+
+def parse_range(text:str) -> list:
+    """
+    A scope from a string of hex code points: `"4E00-9FFF"` (or `"U+4E00-U+9FFF"`), or one code point `"1F600"`.
+
+    :rtype: list
+    :raise ValueError: If it's not a valid range.
+    """
+    start, _, stop = text.partition("-")
+    try:
+        scope = [int(start.upper().removeprefix("U+"), 16), int((stop or start).upper().removeprefix("U+"), 16)]
+    except ValueError:
+        raise ValueError(f"Invalid range `{text}`, expected like `4E00-9FFF`")
+    if(not 0 <= scope[0] <= scope[1] <= 0x10FFFF): raise ValueError(f"Invalid range `{text}`")
+    return scope
+
+
+def read_corpus_scope(texts, min_count:int=1, font_source:Mapping=None) -> list:
+    """
+    The scope of the distinct characters used in `texts`, to generate a subset font of them only.\n\n\
+    The necessary FIGfont characters (see `is_ne_ch()`) needn't be in it, `generate_bin_dic()` always adds them.
+
+    :param texts: Iterable of strings or opened text files.
+    :param min_count: Only the characters used at least `min_count` times.
+    :type min_count: int
+    :param font_source: Optional. Skip the characters not in it (e.g. `dic`), or `generate_bin_dic()` raises `KeyError`.
+    :type font_source: Mapping
+    :return: A list like `[[ch_code, ch_code], ...]` in the order of code points, see `FLF_SCOPE_ARR`.
+    :rtype: list
+    """
+    counter = Counter()
+    for text in texts:
+        for line in ([text] if isinstance(text, str) else text): counter.update(line) # a string or a text file
+    ret_arr = []
+    for ch, count in sorted(counter.items()):
+        code = ord(ch)
+        if(count < min_count or code < 0x0020 or is_ne_ch(code)): continue # control characters, or necessary
+        if(font_source is not None and code not in font_source): continue
+        ret_arr += [[code, code]]
+    return ret_arr
+
+
+def read_hot_codes(texts, hot_size:int=500) -> list:
+    """
+    The `hot_size` most used characters in `texts`, for the hot shard (see `plan_shards()`).\n\n\
+    The control and necessary characters aren't counted, like `read_corpus_scope()`. They're always in the hot shard.
+
+    :param texts: Iterable of strings or opened text files.
+    :param hot_size: How many characters at most.
+    :type hot_size: int
+    :return: The code points, the most used first.
+    :rtype: list
+    """
+    counter = Counter()
+    for text in texts:
+        for line in ([text] if isinstance(text, str) else text): counter.update(line) # a string or a text file
+    codes = (ord(ch) for ch, count in counter.most_common())
+    return list(itertools.islice((code for code in codes if code >= 0x0020 and not is_ne_ch(code)), hot_size))
+
 
+## Read .hex lazily
+class Unifont(Mapping):
+    """
+    A read-only dict-like view of a unifont `.hex` file: `{unicode: hex string}`.\n\n\
+    Nothing is read until the first lookup. Then the file is memory-mapped, and an index\
+    (`unicode -> byte offset`) is loaded from `index_file` or built once and saved there.\n\n\
+    Only the glyphs that are asked for are decoded.
+
+    :param hex_file: The unifont `.hex` file.
+    :type hex_file: str
+    :param index_file: Where the offset index is cached. Default `hex_file + ".idx"`.
+    :type index_file: str
+    """
+    _INDEX_MAGIC = b"UFIX"
+    _INDEX_HEADER = struct.Struct("<4sQQI") # magic, hex file size, hex file mtime_ns, count
+
+    def __init__(self, hex_file:str=INPUT_FILE, index_file:str=None):
+        self.hex_file = hex_file
+        self.index_file = hex_file + ".idx" if index_file is None else index_file
+        self._mm = None
+        self._codes = None # array("I"), sorted code points
+        self._offsets = None # array("I"), where the hex string of `_codes[k]` starts
+
+    def _open(self):
+        if(self._mm is not None): return
+        with open(self.hex_file, "rb") as f:
+            stat = os.fstat(f.fileno())
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        stamp = (stat.st_size, stat.st_mtime_ns)
+        if(not self._load_index(stamp)):
+            self._build_index()
+            self._save_index(stamp)
+
+    def _load_index(self, stamp:tuple) -> bool:
+        try:
+            with open(self.index_file, "rb") as f:
+                magic, size, mtime_ns, count = self._INDEX_HEADER.unpack(f.read(self._INDEX_HEADER.size))
+                if(magic != self._INDEX_MAGIC or (size, mtime_ns) != stamp): return False
+                self._codes = array("I"); self._codes.fromfile(f, count)
+                self._offsets = array("I"); self._offsets.fromfile(f, count)
+        except (OSError, EOFError, struct.error):
+            return False
+        return True
+
+    def _build_index(self):
+        mm = self._mm
+        self._codes = array("I")
+        self._offsets = array("I")
+        pos, size = 0, len(mm)
+        while pos < size:
+            end = mm.find(b"\n", pos)
+            if(end == -1): end = size
+            colon = mm.find(b":", pos, end)
+            if(colon != -1): # not an empty line
+                self._codes.append(int(mm[pos:colon], 16))
+                self._offsets.append(colon + 1)
+            pos = end + 1
+
+    def _save_index(self, stamp:tuple):
+        # Write to a temporary file then rename, so a broken index won't be left.
+        tmp_file = f"{self.index_file}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_file, "wb") as f:
+                f.write(self._INDEX_HEADER.pack(self._INDEX_MAGIC, *stamp, len(self._codes)))
+                self._codes.tofile(f)
+                self._offsets.tofile(f)
+            os.replace(tmp_file, self.index_file)
+        except OSError: # e.g. read-only directory, just don't cache it
+            if(path.exists(tmp_file)): os.remove(tmp_file)
+
+    def _find(self, code:int) -> int:
+        self._open()
+        k = bisect_left(self._codes, code)
+        if(k == len(self._codes) or self._codes[k] != code): return -1
+        return k
+
+    def __getitem__(self, code:int) -> str:
+        k = self._find(code) if isinstance(code, int) else -1
+        if(k == -1): raise KeyError(code)
+        start = self._offsets[k]
+        end = self._mm.find(b"\n", start)
+        if(end == -1): end = len(self._mm)
+        return self._mm[start:end].decode("ascii").rstrip("\r")
 
-## Write .hex to dict
-for line in open(INPUT_FILE, "r"):
-    tmparr:list = line.replace("\n", "").split(":")
-    dic.update({int("0x"+tmparr[0],base=16): tmparr[1]})
+    def __contains__(self, code) -> bool:
+        return isinstance(code, int) and self._find(code) != -1
+
+    def __iter__(self):
+        self._open()
+        return iter(self._codes)
+
+    def __len__(self) -> int:
+        self._open()
+        return len(self._codes)
+
+    def close(self):
+        if(self._mm is not None): self._mm.close()
+        self._mm = self._codes = self._offsets = None
+
+
+dic = Unifont() # The hex file. Won't be read until used.
+
+
+def open_unifont(hex_files:list=None) -> Mapping:
+    """
+    All the glyphs of several unifont `.hex` files, e.g. `unifont.hex` (the BMP) and `unifont_upper.hex`\
+    (download it from <https://unifoundry.com/unifont/> to `INPUT_UPPER_FILE`).
+
+    :param hex_files: The `.hex` files, a file that doesn't exist is skipped. If a code point is in several\
+        files, the first one is used. Default `[INPUT_FILE, INPUT_UPPER_FILE]`.
+    :type hex_files: list
+    :return: A `Unifont`, or a `ChainMap` of them.
+    :rtype: Mapping
+    """
+    if(hex_files is None): hex_files = [INPUT_FILE, INPUT_UPPER_FILE]
+    sources = [dic if hex_file == INPUT_FILE else Unifont(hex_file) for hex_file in hex_files if path.exists(hex_file)]
+    if(not sources): raise ValueError(f"None of the hex files exists: {hex_files}")
+    return sources[0] if len(sources) == 1 else ChainMap(*sources)
 
 
 ## Write JSON
 def generate_json(output_json = OUTPUT_JSON):
     """
-    Generate JSON file of unifont glyphs.
+    Generate JSON file of unifont glyphs.\n\n\
+    The whole file must be parsed to read it, `generate_glyph_store()` is preferred.
 
     :param output_json: The output JSON file
     """
     with open(output_json, "w", encoding="utf-8") as f:
-        f.write(json.dumps(dic, indent=0))
+        f.write(json.dumps(dict(dic), indent=0))
+
+
+## Write binary glyph store
+class GlyphStoreFile(Mapping):
+    """
+    A read-only dict-like view of a binary glyph store written by `generate_glyph_store()`:\
+    `{unicode: hex string}`, so it can be used as `font_source` instead of `Unifont`.\n\n\
+    The file is memory-mapped and a lookup is a binary search in the sorted code points, nothing is parsed.\n\n\
+    File layout (little-endian):
+
+    ```
+    header   "UFGS", format version(u16), unifont version(16 bytes), SHA-256 of the .hex file(32 bytes), count(u32)
+    codes    count * u32, sorted
+    widths   count * u8, 8, 16, 24 or 32
+    offsets  (count + 1) * u32, where the bitmap of codes[k] is: bitmaps[offsets[k]:offsets[k+1]]
+    bitmaps  16, 32, 48 or 64 bytes for every glyph
+    ```
+
+    :param store_file: The glyph store file.
+    :type store_file: str
+    :param unifont_version: Raise `ValueError` if the store isn't generated from this unifont version.
+    :type unifont_version: str
+    """
+    MAGIC = b"UFGS"
+    FORMAT_VERSION = 1
+    HEADER = struct.Struct("<4sH16s32sI")
+
+    def __init__(self, store_file:str=OUTPUT_STORE, unifont_version:str=UNIFONT_VERSION):
+        self.store_file = store_file
+        with open(store_file, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, format_version, version, self.hex_sha256, count = self.HEADER.unpack_from(self._mm)
+        except struct.error:
+            raise ValueError(f"{store_file} is not a glyph store")
+        self.unifont_version = version.rstrip(b"\0").decode("ascii")
+        if(magic != self.MAGIC or format_version != self.FORMAT_VERSION):
+            raise ValueError(f"{store_file} is not a glyph store of format version {self.FORMAT_VERSION}")
+        if(unifont_version is not None and self.unifont_version != unifont_version):
+            raise ValueError(f"{store_file} is generated from unifont {self.unifont_version}, but {unifont_version} is expected. "
+                             "Regenerate it by `generate_glyph_store()`")
+        pos = self.HEADER.size
+        self._codes = self._u32_view(pos, count); pos += 4 * count
+        self._widths = memoryview(self._mm)[pos:pos+count]; pos += count
+        self._offsets = self._u32_view(pos, count + 1); pos += 4 * (count + 1)
+        self._bitmap_start = pos
+
+    def _u32_view(self, pos:int, count:int):
+        if(sys.byteorder == "little"): return memoryview(self._mm)[pos:pos+4*count].cast("I")
+        arr = array("I", self._mm[pos:pos+4*count]); arr.byteswap()
+        return arr
+
+    def is_stale(self, hex_file:str=INPUT_FILE) -> bool:
+        """Whether `hex_file` has been changed since the store was generated."""
+        return file_sha256(hex_file) != self.hex_sha256
+
+    def _find(self, code:int) -> int:
+        k = bisect_left(self._codes, code)
+        if(k == len(self._codes) or self._codes[k] != code): return -1
+        return k
+
+    def bitmap(self, code:int) -> bytes:
+        """The raw bitmap of `code`: 16 bytes (8 pixels width), 32 bytes (16 pixels width, big-endian rows) and so on."""
+        k = self._find(code) if isinstance(code, int) else -1
+        if(k == -1): raise KeyError(code)
+        start = self._bitmap_start
+        return self._mm[start+self._offsets[k]:start+self._offsets[k+1]]
+
+    def width(self, code:int) -> int:
+        k = self._find(code) if isinstance(code, int) else -1
+        if(k == -1): raise KeyError(code)
+        return self._widths[k]
+
+    def __getitem__(self, code:int) -> str:
+        return self.bitmap(code).hex().upper()
+
+    def __contains__(self, code) -> bool:
+        return isinstance(code, int) and self._find(code) != -1
+
+    def __iter__(self):
+        return iter(self._codes)
+
+    def __len__(self) -> int:
+        return len(self._codes)
+
+    def close(self):
+        self._codes = self._widths = self._offsets = None # release the views before closing
+        self._mm.close()
+
+
+def file_sha256(file:str) -> bytes:
+    h = hashlib.sha256()
+    with open(file, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""): h.update(block)
+    return h.digest()
+
+
+def generate_glyph_store(output_store:str=OUTPUT_STORE, hex_file:str=INPUT_FILE, unifont_version:str=UNIFONT_VERSION):
+    """
+    Generate the binary glyph store of a unifont `.hex` file. See `GlyphStoreFile`.
+
+    :param output_store: The output glyph store file.
+    :type output_store: str
+    :param hex_file: The unifont `.hex` file.
+    :type hex_file: str
+    :param unifont_version: The unifont version written in the header.
+    :type unifont_version: str
+    """
+    font_source = Unifont(hex_file)
+    codes = array("I", sorted(font_source))
+    widths = bytearray()
+    offsets = array("I", [0])
+    bitmaps = bytearray()
+    for code in codes:
+        bitmap = bytes.fromhex(font_source[code])
+        widths.append(len(bitmap) // 2) # 16 bytes => 8 pixels, 32 bytes => 16 pixels, ...
+        bitmaps += bitmap
+        offsets.append(len(bitmaps))
+    font_source.close()
+    if(sys.byteorder != "little"): codes.byteswap(); offsets.byteswap()
+    header = GlyphStoreFile.HEADER.pack(GlyphStoreFile.MAGIC, GlyphStoreFile.FORMAT_VERSION,
+                                        unifont_version.encode("ascii"), file_sha256(hex_file), len(widths))
+    _atomic_write(output_store, header + codes.tobytes() + widths + offsets.tobytes() + bitmaps)
+
+
+MISSING_CH_HEX = "0000007E665A5A7A76767E76767E0000" # U+FFFD, The "missing character".
+
+
+def _decode_rows(hex_str:str, width:int):
+    """The rows (ints, big-endian in the hex) of glyphs of the same `width`."""
+    data = bytes.fromhex(hex_str)
+    if(width == 8): return data
+    if(width in (16, 32)):
+        rows = array("H" if width == 16 else "I", data)
+        if(rows.itemsize * 8 != width): raise RuntimeError(f"array('{rows.typecode}') is expected to be {width} bits")
+        if(sys.byteorder == "little"): rows.byteswap()
+        return rows
+    step = width // 8
+    return [int.from_bytes(data[k:k+step], "big") for k in range(0, len(data), step)]
+
+
+class GlyphStore(Mapping):
+    """
+    Compact bitmaps of unifont glyphs. Every glyph is 16 rows, each row is an integer\
+    (a `uint8` for 8 pixels width, a `uint16` for 16 pixels width), stored in one `array("H")`.\
+    If there are wider glyphs (24 or 32 pixels, in unifont_upper), the rows are stored in one `array("I")`.\n\n\
+    As a `Mapping`, it gives the old 0-1 string view: `{unicode: [lists of 0-1 string]}`,\
+    which is converted when asked. Use `rows()`/`width()` or `as_numpy()` to get the packed data.
+
+    :param codes: The unicode of every glyph, in the order of generating.
+    :type codes: list
+    :param widths: The width (8, 16, 24 or 32) of every glyph.
+    :type widths: bytearray
+    :param rows: `16 * len(codes)` rows of every glyph.
+    :type rows: array
+    """
+    HEIGHT = 16
+    WIDTHS = {32: 8, 64: 16, 96: 24, 128: 32} # hex digits => pixels
+
+    def __init__(self, codes:list, widths:bytearray, rows:array):
+        self.codes = codes
+        self.widths = widths
+        self.rows_arr = rows
+        self._index = {code: k for k, code in enumerate(codes)}
+
+    @classmethod
+    def from_hex(cls, hex_items) -> "GlyphStore":
+        """
+        Decode hex strings in bulk by `bytes.fromhex`.
+
+        :param hex_items: Iterable of `(unicode, hex string)`. The hex string must be 32, 64, 96 or 128 digits.
+        :rtype: GlyphStore
+        """
+        codes, widths, groups = [], bytearray(), {} # width => hex strings
+        for code, hex_ch in hex_items:
+            width = cls.WIDTHS.get(len(hex_ch)) # 8: width 1ch (e.g: A), 16: width 2ch (e.g: 乐)
+            if(width is None): raise ValueError(f"Unexpected glyph U+{code:04X}: {hex_ch}")
+            codes.append(code)
+            widths.append(width)
+            groups.setdefault(width, []).append(hex_ch)
+        rows = array("H" if max(widths, default=8) <= 16 else "I")
+        group_rows = {}
+        for width, hex_strs in groups.items():
+            group_rows[width] = _decode_rows("".join(hex_strs), width)
+            if(isinstance(group_rows[width], array) and group_rows[width].typecode != rows.typecode):
+                group_rows[width] = array(rows.typecode, group_rows[width])
+        group_pos = dict.fromkeys(groups, 0)
+        for w in widths:
+            pos = group_pos[w]
+            rows.extend(group_rows[w][pos:pos+16])
+            group_pos[w] = pos + 16
+        return cls(codes, widths, rows)
+
+    def rows(self, code:int) -> array:
+        """The 16 packed rows of `code`. The most significant bit is the left pixel."""
+        k = self._index[code] * self.HEIGHT
+        return self.rows_arr[k:k+self.HEIGHT]
+
+    def width(self, code:int) -> int:
+        return self.widths[self._index[code]]
+
+    def key(self, code:int) -> bytes:
+        """The content of the glyph `code` (width and rows), e.g. as a cache key."""
+        return bytes((self.width(code),)) + self.rows(code).tobytes()
+
+    def digest(self) -> str:
+        """SHA-256 of every code point and glyph in the store."""
+        h = hashlib.sha256()
+        h.update(array("I", self.codes).tobytes())
+        h.update(self.widths)
+        h.update(self.rows_arr.tobytes())
+        return h.hexdigest()
+
+    def subset(self, codes) -> "GlyphStore":
+        """A new `GlyphStore` of `codes` (in that order)."""
+        rows = array(self.rows_arr.typecode)
+        for code in codes: rows.extend(self.rows(code))
+        return GlyphStore(list(codes), bytearray(map(self.width, codes)), rows)
+
+    def as_numpy(self):
+        """
+        :return: `(codes, widths, rows)` as NumPy arrays. `rows` is a `(N, 16)` `uint16` (or `uint32`) view (no copy).
+        """
+        import numpy as np
+        return (np.array(self.codes, dtype=np.uint32),
+                np.frombuffer(self.widths, dtype=np.uint8),
+                np.frombuffer(self.rows_arr, dtype=np.uint16 if self.rows_arr.itemsize == 2 else np.uint32).reshape(-1, self.HEIGHT))
+
+    def __getitem__(self, code:int) -> list:
+        w = self.width(code)
+        return [format(row, f"0{w}b") for row in self.rows(code)]
+
+    def __contains__(self, code) -> bool:
+        return code in self._index
 
+    def __iter__(self):
+        return iter(self.codes)
 
-def generate_bin_dic(flf_scope_arr:list=FLF_SCOPE_ARR) -> dict:
+    def __len__(self) -> int:
+        return len(self.codes)
+
+
+def generate_bin_dic(flf_scope_arr:list=None, font_source:Mapping=dic, missing_to_zero:bool=False) -> GlyphStore:
     """
-    Generate the 0-1 strings for unifont glyphs in `flf_scope_arr`
+    Generate the bitmaps for unifont glyphs in `flf_scope_arr`
     
     :param flf_scope_arr: A list of unicode scopes.\n\n\
         The list should contain several lists of scope.\n\n\
-        e.g. `[[0x4E00,0x9FFF],[0x0020,0x0020]]`.
+        e.g. `[[0x4E00,0x9FFF],[0x0020,0x0020]]`. Default `get_flf_scope_arr()`.
     :type flf_scope_arr: list
-    :return: A dict like `{unicode: [lists of 0-1 string]}`.\n\n\
+    :param font_source: Where to get the hex strings. A `Unifont` or a dict like `{unicode: hex string}`.
+    :type font_source: Mapping
+    :param missing_to_zero: The code points not in `font_source` get the "missing character" glyph\
+        (the glyph of `0`), instead of raising `KeyError`. E.g. the unassigned code points of a block.
+    :type missing_to_zero: bool
+    :return: A `GlyphStore`. It can be used like a dict `{unicode: [lists of 0-1 string]}`.\n\n\
         Every string in the list corresponds a line.\n\n\
         e.g. `{1:["01010101","01010101","01010101",...],...}`
-    :rtype: dict
+    :rtype: GlyphStore
     """
-    ret_dic = {}
+    if(flf_scope_arr is None): flf_scope_arr = get_flf_scope_arr()
+    hex_dic = {} # keep the first position if a code is in several scopes
     for scope in flf_scope_arr+[[0x0020,0x007E]]:
         for i in range(scope[0], scope[1]+1):
-            bin_str = ""
-            hex_ch:str = dic[i]
-            line_break_cnt = 4 # when to break(based on hex digits) # hex_ch=64, width:2ch (e.g: 乐)
-            if(len(hex_ch) == 32): line_break_cnt = 2 # width:1ch (e.g: A)
-            cnt = 0 # how many hex digits have read for each line?
-            # begin convert hex to bin string
-            for ch in hex_ch:
-                cnt += 1
-                bin_str += HEX2BIN[ch]
-                if(cnt % line_break_cnt == 0 and cnt != len(hex_ch)): # line break
-                    # not:last line(if don't use `and cnt != len(hex_ch)`, the FIGcharacter's end will be like: `{data}@\n@@\n` ,but expected `{data}@@\n`)
-                    bin_str += "\n"
-            # end convert
-            ret_dic.update({i: bin_str.split("\n")})
-    ret_dic.update( # The "missing character".
-        {0:["00000000", # FFFD:0000007E665A5A7A76767E76767E0000
-            "00000000",
-            "00000000",
-            "01111110",
-            "01100110",
-            "01011010",
-            "01011010",
-            "01111010",
-            "01110110",
-            "01110110",
-            "01111110",
-            "01110110",
-            "01110110",
-            "01111110",
-            "00000000",
-            "00000000"]})
-    return ret_dic
-
+            if(i in hex_dic): continue
+            if(missing_to_zero and i not in font_source): hex_dic[i] = MISSING_CH_HEX
+            else: hex_dic[i] = font_source[i]
+    hex_dic[0] = MISSING_CH_HEX
+    return GlyphStore.from_hex(hex_dic.items())
 
 
 def is_ne_ch(code_num:int) -> bool: # is necessary character?
@@ -129,6 +554,247 @@ def is_ne_ch(code_num:int) -> bool: # is necessary character?
     return False
 
 
+## Profiling
+PROFILE_ENV = "UNIF_FIG_PROFILE" # Set it to the report file (JSON) to profile without editing the source
+PROFILE_DIR_ENV = "UNIF_FIG_PROFILE_DIR" # Optional, where the cProfile dumps are written
+PROFILE_SLOWEST_ENV = "UNIF_FIG_PROFILE_SLOWEST" # Optional, `Profiler.slowest`
+PROFILE_MEMORY_ENV = "UNIF_FIG_PROFILE_MEMORY" # Optional, `0` to turn off `Profiler.trace_memory`
+_profiler:"Profiler" = None # Not `None` only if profiling is on, see `enable_profiling()`
+
+class Profiler:
+    """
+    Opt-in instrumentation of the `ch_` generators and `generate_flf()`, see `enable_profiling()`.\n\n\
+    Every style (a generator function with its arguments) and every written font is a stage.\
+    A stage records the calls, seconds, glyphs, rendered (UTF-8) or written bytes and the tracemalloc peak.\
+    A style also records every call as a chunk `[first code, last code, glyphs, seconds]`\
+    (`Generator_figfont.lazy()` renders a chunk at a time) and the slowest glyphs.\
+    The renders of the font headers (one glyph, see `Generator_figfont.profiled`) aren't recorded.
+
+    :param profile_dir: Optional. Write the cProfile stats of every stage to `<profile_dir>/<stage>.prof`.\
+        A stage run inside another one (e.g. a style rendered lazily by `generate_flf()`) has its own stats,\
+        and they're added to the stats of the outer stage too.
+    :type profile_dir: str
+    :param slowest: How many slowest glyphs are reported for a style. They're timed one glyph at a time\
+        with the pure Python generators when the report is made (not counted in the stages). `0` to skip.\
+        Only a sample is timed: the glyphs of the `SAMPLE_CHUNKS` slowest chunks, `SAMPLE_GLYPHS` at most.
+    :type slowest: int
+    :param trace_memory: Trace the peak memory by tracemalloc, which makes everything slower.
+    :type trace_memory: bool
+    """
+    SAMPLE_CHUNKS = 2
+    SAMPLE_GLYPHS = 1024
+
+    def __init__(self, profile_dir:str=None, slowest:int=10, trace_memory:bool=True):
+        self.profile_dir = profile_dir
+        self.slowest = slowest
+        self.trace_memory = trace_memory
+        self.stages = {}
+        self._frames = [] # the running stages
+        self._stats = {} # stage name => pstats.Stats
+        self._samples = {} # style name => (func, args, kwargs, [(seconds per glyph, codes, generator)]), the slowest chunks
+        self._start = time.perf_counter()
+        self._started_tracemalloc = False
+        if(trace_memory):
+            import tracemalloc
+            if(not tracemalloc.is_tracing()):
+                tracemalloc.start()
+                self._started_tracemalloc = True
+
+    @staticmethod
+    def style_name(func_name:str, args:tuple, kwargs:dict) -> str:
+        """The name in `FONT_STYLES`, or like `ch_box_drawing(style='double')`."""
+        if(not args):
+            for name, style in FONT_STYLES.items():
+                if(style == (func_name, kwargs)): return name
+        arg_strs = [repr(arg) for arg in args] + [f"{key}={value!r}" for key, value in kwargs.items()]
+        return f"{func_name}({', '.join(arg_strs)})"
+
+    @contextlib.contextmanager
+    def _stage(self, name:str, kind:str):
+        import tracemalloc
+        memory = 0
+        if(self.trace_memory):
+            memory, peak = tracemalloc.get_traced_memory()
+            for frame in self._frames: frame["peak"] = max(frame["peak"], peak)
+            tracemalloc.reset_peak()
+        frame = {"start": time.perf_counter(), "memory": memory, "peak": memory}
+        outer_profile = self._frames[-1]["profile"] if self._frames else None
+        self._frames.append(frame)
+        profile = frame["profile"] = None
+        if(self.profile_dir is not None):
+            import cProfile
+            # cProfile can't be nested, the outer profile is paused. The stats are added to it when they're done.
+            if(outer_profile is not None): outer_profile.disable()
+            profile = frame["profile"] = cProfile.Profile()
+            frame["nested_stats"] = []
+            profile.enable()
+        try:
+            yield frame
+        finally:
+            if(profile is not None):
+                profile.disable()
+                if(outer_profile is not None): outer_profile.enable()
+            self._frames.pop()
+            frame["seconds"] = time.perf_counter() - frame["start"]
+            if(self.trace_memory):
+                frame["peak"] = max(frame["peak"], tracemalloc.get_traced_memory()[1])
+                for outer in self._frames: outer["peak"] = max(outer["peak"], frame["peak"])
+        stage = self.stages.setdefault(name, {"kind": kind, "calls": 0, "seconds": 0.0, "glyphs": 0, "peak_bytes": 0})
+        stage["calls"] += 1
+        stage["seconds"] += frame["seconds"]
+        stage["peak_bytes"] = max(stage["peak_bytes"], frame["peak"] - frame["memory"])
+        if(profile is not None):
+            import pstats
+            stats = pstats.Stats()
+            profile.create_stats()
+            if(profile.stats): stats.add(profile) # `pstats` refuses an empty profile
+            for nested_stats in frame["nested_stats"]: stats.add(nested_stats)
+            if(self._frames): self._frames[-1]["nested_stats"].append(stats)
+            self._stats.setdefault(name, pstats.Stats()).add(stats) # not `stats` itself, it's in the outer stats
+
+    def run_style(self, func, generator:"Generator_figfont", args:tuple, kwargs:dict) -> "Figfont":
+        name = self.style_name(func.__name__, args, kwargs)
+        with self._stage(name, "style") as frame:
+            ret_fig = func(generator, *args, **kwargs)
+        codes = list(generator.bin_dic)
+        stage = self.stages[name]
+        stage["glyphs"] += len(codes)
+        stage["rendered_bytes"] = stage.get("rendered_bytes", 0) + sum(
+            len(line.encode("utf-8")) for lines in ret_fig.font_dic.values() for line in lines)
+        if(codes): stage.setdefault("chunks", []).append([min(codes), max(codes), len(codes), frame["seconds"]])
+        if(self.slowest > 0 and codes):
+            # Keep the slowest chunks only, the generators of the others are dropped.
+            sample = self._samples.setdefault(name, (func, args, kwargs, []))[3]
+            sample.append((frame["seconds"] / len(codes), codes, generator))
+            sample.sort(key=lambda chunk: -chunk[0])
+            del sample[self.SAMPLE_CHUNKS:]
+        return ret_fig
+
+    def _time_glyphs(self):
+        """Time the sampled glyphs of the styles one by one, without tracemalloc (it's much slower with it)."""
+        import tracemalloc
+        if(not self._samples): return
+        restart = self._started_tracemalloc and tracemalloc.is_tracing()
+        if(restart): tracemalloc.stop()
+        for name, (func, args, kwargs, sample) in self._samples.items():
+            timings = self.stages[name].get("slowest_glyphs", [])
+            glyphs = itertools.islice(((code, generator) for _, codes, generator in sample for code in codes), self.SAMPLE_GLYPHS)
+            for code, generator in glyphs:
+                sub_generator = generator._sub_generator([code])
+                sub_generator.vectorize = False
+                start = time.perf_counter()
+                func(sub_generator, *args, **kwargs)
+                timings.append([code, time.perf_counter() - start])
+            self.stages[name]["slowest_glyphs"] = sorted(timings, key=lambda timing: -timing[1])[:self.slowest]
+        self._samples = {}
+        if(restart): tracemalloc.start()
+
+    def run_flf(self, func, output_flf:str, fig_font:"Figfont", args:tuple, kwargs:dict):
+        name = "generate_flf:" + path.basename(output_flf)
+        with self._stage(name, "flf"):
+            func(output_flf, fig_font, *args, **kwargs)
+        stage = self.stages[name]
+        stage["glyphs"] += len(fig_font.font_dic)
+        stage["output_bytes"] = path.getsize(output_flf)
+
+    def report(self) -> dict:
+        """The report, can be dumped as JSON."""
+        self._time_glyphs()
+        return {
+            "unifont_version": UNIFONT_VERSION,
+            "generator_version": GENERATOR_VERSION,
+            "seconds": time.perf_counter() - self._start,
+            "stages": self.stages,
+        }
+
+    def summary(self) -> str:
+        """A short text summary, the slowest stage first."""
+        self._time_glyphs()
+        lines = []
+        for name, stage in sorted(self.stages.items(), key=lambda item: -item[1]["seconds"]):
+            line = f"{name}: {stage['seconds']:.3f}s, {stage['calls']} calls, {stage['glyphs']} glyphs"
+            if(stage["kind"] == "style"): line += f", {stage.get('rendered_bytes', 0)} Bytes rendered"
+            else: line += f", {stage['output_bytes']} Bytes written"
+            if(self.trace_memory): line += f", peak {stage['peak_bytes'] / 2**20:.1f}MiB"
+            if(len(stage.get("chunks", ())) > 2): # the first call has the one-off costs, like importing NumPy
+                first, last, glyphs, seconds = max(stage["chunks"][1:], key=lambda chunk: chunk[3] / chunk[2])
+                line += f", slowest chunk U+{first:04X}-U+{last:04X} ({seconds * 1000 / glyphs:.3f}ms/glyph)"
+            if(stage.get("slowest_glyphs")):
+                code, seconds = stage["slowest_glyphs"][0]
+                line += f", slowest glyph U+{code:04X} ({seconds * 1000:.3f}ms)"
+            lines.append(line)
+        return "\n".join(lines)
+
+    def write(self, report_file:str):
+        """Write the report as JSON, and the cProfile dumps if `profile_dir` is given."""
+        _atomic_write(path.abspath(report_file), json.dumps(self.report(), indent=2).encode("utf-8"))
+        if(self.profile_dir is not None):
+            os.makedirs(self.profile_dir, exist_ok=True)
+            for name, stats in self._stats.items():
+                file_name = "".join(ch if ch.isalnum() or ch in "._-" else "_" for ch in name)
+                stats.dump_stats(path.join(self.profile_dir, file_name + ".prof"))
+
+    def close(self):
+        if(self._started_tracemalloc):
+            import tracemalloc
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+
+def enable_profiling(profile_dir:str=None, slowest:int=10, trace_memory:bool=True) -> Profiler:
+    """
+    Turn on profiling of the `ch_` generators and `generate_flf()`. See `Profiler`.\n\n\
+    It's turned on at import if the environment variable `UNIF_FIG_PROFILE` is set to a report file,\
+    the report is written and summarized (to stderr) at exit.
+
+    :return: The `Profiler`, call `write()` or `summary()` after generating.
+    :rtype: Profiler
+    """
+    global _profiler
+    disable_profiling()
+    _profiler = Profiler(profile_dir, slowest, trace_memory)
+    return _profiler
+
+
+def disable_profiling() -> Profiler:
+    """Turn off profiling. Return the `Profiler` (or `None`)."""
+    global _profiler
+    profiler, _profiler = _profiler, None
+    if(profiler is not None): profiler.close()
+    return profiler
+
+
+def _profiled_style(func):
+    """Make a `ch_` generator a stage of the profiler. Only `_profiler` is checked if profiling is off."""
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        if(_profiler is None or not self.profiled): return func(self, *args, **kwargs)
+        return _profiler.run_style(func, self, args, kwargs)
+    return wrapper
+
+
+def _profiled_flf(func):
+    """Make `generate_flf()` a stage of the profiler. Only `_profiler` is checked if profiling is off."""
+    @functools.wraps(func)
+    def wrapper(output_flf, fig_font, *args, **kwargs):
+        if(_profiler is None): return func(output_flf, fig_font, *args, **kwargs)
+        return _profiler.run_flf(func, output_flf, fig_font, args, kwargs)
+    return wrapper
+
+
+def _write_profile_at_exit():
+    if(_profiler is not None):
+        _profiler.write(os.environ[PROFILE_ENV])
+        print(_profiler.summary(), file=sys.stderr)
+
+
+if(os.environ.get(PROFILE_ENV)):
+    import atexit
+    enable_profiling(os.environ.get(PROFILE_DIR_ENV) or None, int(os.environ.get(PROFILE_SLOWEST_ENV) or 10),
+                     os.environ.get(PROFILE_MEMORY_ENV, "1") != "0")
+    atexit.register(_write_profile_at_exit)
+
+
 # FIGchars generate
 
 @dataclass
@@ -160,6 +826,83 @@ License of this FIGfont and unifont is SIL OPEN FONT LICENSE Version 1.1(OFL 1.1
     full_layout:int = 0 # none
     codetag_count:int = 0
 
+## Lookup tables of the generators
+# The rows of a glyph are ints, the most significant bit is the left pixel (see `GlyphStore.rows()`).
+# Every table maps some packed bits to the finished cells, so a line is a few lookups and a join.
+# The tables are built once for every set of arguments.
+@functools.lru_cache(maxsize=None)
+def _filling_table(ch_fill:str, ch_blank:str) -> tuple:
+    """`table[byte]`: the 8 cells of 8 pixels."""
+    return tuple("".join(ch_fill if byte >> (7-k) & 1 else ch_blank for k in range(8)) for byte in range(256))
+
+@functools.lru_cache(maxsize=None)
+def _cell_table(cell_w:int, cell_h:int, glyphs:tuple) -> tuple:
+    """
+    `table[n0 << 4*(cell_h-1) | ... | n(cell_h-1)]`: the `4 // cell_w` cells of a band of `cell_h` lines, 4 columns wide.\n\n\
+    `nk` is the nibble of line `k`, see `_cell_keys()`. The cells are `glyphs[index]`, see `Generator_figfont._draw_cells()`.
+    """
+    columns = []
+    for k in range(4 // cell_w):
+        indexes = [0] # the index of cell `k` for every key, built a line (the next 4 bits of the key) at a time
+        for line in range(cell_h):
+            bits = [sum(1 << (line*cell_w + c) for c in range(cell_w) if nibble >> (3 - k*cell_w - c) & 1) for nibble in range(16)]
+            indexes = [index | bit for index in indexes for bit in bits]
+        columns.append([glyphs[index] for index in indexes])
+    return tuple(map("".join, zip(*columns)))
+
+@functools.lru_cache(maxsize=None)
+def _box_drawing_table(boxt:tuple) -> tuple:
+    """
+    `table[upper window << 5 | lower window]`: the 4 cells of 5-pixel windows of 2 lines, see `ch_box_drawing()`.\n\n\
+    A window is the pixels of the columns `col-1`..`col+3`, the cells are the columns `col`..`col+3`.
+    """
+    ret_arr = []
+    for key in range(1024):
+        upper, lower = key >> 5, key & 31
+        cells = ""
+        for k in range(4):
+            a = upper >> (3-k) & 1 # line-1,col
+            b = upper >> (4-k) & 1 # line-1,col-1
+            c = lower >> (4-k) & 1 # line,col-1
+            d = lower >> (3-k) & 1 # line,col
+            cells += boxt[a + b*2 + c*4 + d*8]
+        ret_arr.append(cells)
+    return tuple(ret_arr)
+
+# The intermediate forms of a glyph: the keys of the tables above for every line, see `Generator_figfont._draw()`.
+def _byte_keys(width:int, rows:list) -> list:
+    return [[row >> shift & 0xFF for shift in range(width-8, -1, -8)] for row in rows]
+
+def _cell_keys(cell_h:int, width:int, rows:list) -> list:
+    """The keys of `_cell_table()` for every band of `cell_h` lines. The lines out of the glyph are 0."""
+    if(len(rows) % cell_h): rows = list(rows) + [0] * (-len(rows) % cell_h)
+    shifts = range(width-4, -1, -4)
+    bands = zip(*[rows[line::cell_h] for line in range(cell_h)])
+    # Unrolled for the cells of the generators, about twice as fast as the general case.
+    if(cell_h == 2):
+        return [[(r0 >> shift & 15) << 4 | (r1 >> shift & 15) for shift in shifts] for r0, r1 in bands]
+    if(cell_h == 3):
+        return [[(r0 >> shift & 15) << 8 | (r1 >> shift & 15) << 4 | (r2 >> shift & 15) for shift in shifts]
+                for r0, r1, r2 in bands]
+    if(cell_h == 4):
+        return [[(r0 >> shift & 15) << 12 | (r1 >> shift & 15) << 8 | (r2 >> shift & 15) << 4 | (r3 >> shift & 15)
+                 for shift in shifts]
+                for r0, r1, r2, r3 in bands]
+    offsets = range(4*(cell_h-1), -1, -4) # where the nibble of every line goes in the key
+    return [[sum((row >> shift & 15) << offset for row, offset in zip(band, offsets)) for shift in shifts] for band in bands]
+
+def _box_drawing_keys(width:int, rows:list) -> tuple:
+    """`(width, keys)`. A window is the pixels of 2 lines at the columns `col-1`..`col+3`, see `_box_drawing_table()`."""
+    # The pixels out of the glyph are 0, so a line is shifted to have 4 blank columns after it.
+    padded = [0] + [row << 4 for row in rows] + [0] # line-1 of the first line and line of the last line are blank
+    return width, [[(upper >> shift & 31) << 5 | (lower >> shift & 31) for shift in range(width, -1, -4)]
+                   for upper, lower in zip(padded[:-1], padded[1:])]
+
+def _table_draw(table:tuple):
+    """Draw the lines of a form with `table`."""
+    return lambda lines: ["".join(map(table.__getitem__, keys)) for keys in lines]
+
+
 class Generator_figfont:
     """
     The class to include all the FIGfont generator.\n\n\
@@ -167,7 +910,10 @@ class Generator_figfont:
     Note the "generator" here don't means `generator` in python.
 
     :param bin_dic: The 0-1 string of FIGcharacters. Generated by `generate_bin_dic()`
-    :type bin_dic: dict
+    :type bin_dic: GlyphStore | dict
+    :param vectorize: Use the NumPy generators if NumPy is installed. Set it `False` to avoid\
+        importing NumPy, e.g. when only a few glyphs are rendered.
+    :type vectorize: bool
     """
     def _attribute_str(self, fig:Figfont) -> str:
         return " ".join(
@@ -177,8 +923,19 @@ class Generator_figfont:
             )
         )
     
-    def __init__(self, bin_dic:dict):
+    def _set_header(self, fig:Figfont):
+        fig.codetag_count = self.codetag_cnt
+        fig.font_header = f"flf2a$ {self._attribute_str(fig)}\n{fig.font_comment}\n"
+    
+    def __init__(self, bin_dic:dict, vectorize:bool=True, max_width:int=None):
         self.bin_dic = bin_dic
+        self.vectorize = vectorize
+        # The width of the widest glyph, for the `max_length` of the headers. Given by the sub generators,
+        # so a header rendered from a few glyphs fits all of them.
+        if(max_width is None):
+            if(isinstance(bin_dic, GlyphStore)): max_width = max(bin_dic.widths, default=16)
+            else: max_width = max((len(lines[0]) for lines in bin_dic.values()), default=16)
+        self.max_width = max_width
         self.font_header_attribute_arrange = ["height", "baseline", "max_length", "old_layout", "comment_lines", "print_direction", "full_layout", "codetag_count"]
         iter_bin_dic = iter(bin_dic)
         self.codetag_cnt = 0
@@ -189,7 +946,208 @@ class Generator_figfont:
                 self.codetag_cnt += 1
             except StopIteration:
                 break
+        self._np_groups = None
+        self._pending = None # the deferred drawings of `generate_styles()`
+        self.profiled = True # `False` for the one-glyph generators of the font headers, see `Profiler`
     
+    def _bitmap_groups(self):
+        """
+        The bitmaps grouped by width for the vectorized (NumPy) generators.
+
+        :return: `[(codes, bits), ...]`, `bits` is a `(n, 16, width)` `uint8` array of 0/1.\n\n\
+            `None` if NumPy isn't installed (or `vectorize` is `False`) or `bin_dic` isn't a `GlyphStore`.
+        """
+        if(self._np_groups is None):
+            if(not self.vectorize or not isinstance(self.bin_dic, GlyphStore)): return None
+            try:
+                import numpy as np
+            except ImportError:
+                return None
+            codes, widths, rows = self.bin_dic.as_numpy()
+            self._np_groups = []
+            for w in np.unique(widths).tolist():
+                sel = widths == w
+                shifts = np.arange(w-1, -1, -1, dtype=rows.dtype) # the most significant bit is the left pixel
+                bits = ((rows[sel][:, :, None] >> shifts) & 1).astype(np.uint8)
+                self._np_groups.append((codes[sel].tolist(), bits))
+        return self._np_groups
+
+    def _draw(self, ret_fig:Figfont, name:str, form, draw, vectorized:bool=False):
+        """
+        Fill `ret_fig.font_dic` with `draw(form(...))` of every glyph.\n\n\
+        `form` computes the intermediate form of the glyphs, which is the same for the styles of a kind\
+        (e.g. the box drawing windows), and `draw` turns it into the lines of this style with its lookup table.\
+        In `generate_styles()`, the drawing is deferred, so every form `name` is computed once for all the styles.
+
+        :param name: The name of the form.
+        :param form: `form(width, rows)` of a glyph, see `_glyph_rows()`.\
+            If `vectorized`, `form(bits)` of a width group, see `_bitmap_groups()`.
+        :param draw: `draw(form) -> [lines]`.\
+            If `vectorized`, `draw(form) -> cells`: a `(n, lines, columns, k)` `uint32` array\
+            of unicode ordinals, `k` characters for each column.
+        """
+        if(self._pending is None): self._draw_form(form, [(ret_fig, draw)], vectorized)
+        else: self._pending.setdefault((name, vectorized), (form, []))[1].append((ret_fig, draw))
+
+    def _draw_form(self, form, fig_draws:list, vectorized:bool):
+        """Compute `form` of the glyphs once and draw every `(ret_fig, draw)` of `fig_draws` with it, see `_draw()`."""
+        if(not vectorized):
+            font_dics = [ret_fig.font_dic for ret_fig, draw in fig_draws]
+            draws = [draw for ret_fig, draw in fig_draws]
+            for i in self.bin_dic:
+                glyph_form = form(*self._glyph_rows(i))
+                for font_dic, draw in zip(font_dics, draws): font_dic[i] = draw(glyph_form)
+            return
+        import numpy as np
+        results = [{} for _ in fig_draws]
+        for codes, bits in self._bitmap_groups():
+            group_form = form(bits)
+            for result, (ret_fig, draw) in zip(results, fig_draws):
+                cells = np.ascontiguousarray(draw(group_form), dtype=np.uint32)
+                n, lines, columns, k = cells.shape
+                # Every line is `columns*k` UCS-4 characters, so view it as a numpy str. The "\0" at the end will be stripped.
+                line_arr = cells.reshape(n, lines, columns*k).view(np.dtype(("U", columns*k))).reshape(n, lines).tolist()
+                result.update(zip(codes, line_arr))
+        for result, (ret_fig, draw) in zip(results, fig_draws):
+            ret_fig.font_dic = {i: result[i] for i in self.bin_dic} # in `bin_dic` order
+    def _sub_generator(self, codes:list) -> "Generator_figfont":
+        """A generator of the glyphs `codes` only."""
+        if(isinstance(self.bin_dic, GlyphStore)):
+            return Generator_figfont(self.bin_dic.subset(codes), self.vectorize, self.max_width)
+        return Generator_figfont({i: self.bin_dic[i] for i in codes}, self.vectorize, self.max_width)
+
+    def generate_styles(self, styles:list) -> list:
+        """
+        Generate several styles in one pass, like `[getattr(self, func_name)(**kwargs) for func_name, kwargs in styles]`.\n\n\
+        The intermediate form of every glyph (the box drawing windows, the half-block pairs, the braille bands\
+        or the bits) is computed once and drawn in all the styles using it, only the lookup tables differ. See `_draw()`.
+
+        :param styles: `[(func_name, kwargs), ...]`, like the values of `FONT_STYLES`.
+        :type styles: list
+        :return: The `Figfont` objects, in the order of `styles`.
+        :rtype: list
+        """
+        # When profiling, every style is timed on its own.
+        if(self._pending is not None or _profiler is not None):
+            return [getattr(self, func_name)(**kwargs) for func_name, kwargs in styles]
+        self._pending = {} # (form name, vectorized) => (form, [(ret_fig, draw)])
+        try:
+            ret_figs = [getattr(self, func_name)(**kwargs) for func_name, kwargs in styles]
+            for (name, vectorized), (form, fig_draws) in self._pending.items():
+                self._draw_form(form, fig_draws, vectorized)
+        finally:
+            self._pending = None
+        return ret_figs
+
+    def lazy(self, func_name:str, chunk_size:int=512, **kwargs) -> Figfont:
+        """
+        Like `getattr(self, func_name)(**kwargs)`, but the glyphs aren't rendered until they're used.\n\n\
+        The `font_dic` of the returned `Figfont` is a `LazyFontDic`: `generate_flf()` renders and writes\
+        `chunk_size` glyphs at a time, so the memory doesn't grow with the number of glyphs.
+
+        :param func_name: The generator function, like `"ch_box_drawing"`.
+        :type func_name: str
+        :param chunk_size: How many glyphs to render at a time.
+        :type chunk_size: int
+        :return: A `Figfont` object. See Figfont.
+        :rtype: Figfont
+        """
+        return self.lazy_styles([(func_name, kwargs)], chunk_size)[0]
+
+    def lazy_styles(self, styles:list, chunk_size:int=512) -> list:
+        """
+        Like `generate_styles(styles)`, but the glyphs aren't rendered until they're used, see `lazy()`.\n\n\
+        A chunk is rendered for all the styles at once, so write the fonts in lockstep with `generate_flfs()`.
+
+        :param styles: `[(func_name, kwargs), ...]`, like the values of `FONT_STYLES`.
+        :type styles: list
+        :param chunk_size: How many glyphs to render at a time.
+        :type chunk_size: int
+        :return: The `Figfont` objects, in the order of `styles`.
+        :rtype: list
+        """
+        # Render one glyph to get the headers of the styles, NumPy isn't worth it for one glyph
+        header_generator = self._sub_generator(list(self.bin_dic)[:1])
+        header_generator.vectorize = False
+        header_generator.profiled = False
+        ret_figs = header_generator.generate_styles(styles)
+        chunks = StyleChunks(self, styles, chunk_size)
+        for style_k, ret_fig in enumerate(ret_figs):
+            ret_fig.font_dic = LazyFontDic(chunks, style_k)
+            self._set_header(ret_fig)
+        return ret_figs
+
+    def trim(self, fig_font:Figfont, gap:int=1) -> Figfont:
+        """
+        Trim the blank margins of every glyph and set the layout to kerning, see `TrimmedFontDic`.\n\n\
+        The glyphs are trimmed when they're read, so it works with `lazy()` too.
+
+        :param fig_font: Generated by a function of this generator.
+        :type fig_font: Figfont
+        :param gap: See `TrimmedFontDic`.
+        :type gap: int
+        :return: `fig_font`, trimmed.
+        :rtype: Figfont
+        """
+        fig_font.font_dic = TrimmedFontDic(fig_font.font_dic, gap)
+        fig_font.old_layout = 0 # kerning
+        fig_font.full_layout = 64 # horizontal kerning, no smushing rule: the box drawing characters shouldn't be merged
+        self._set_header(fig_font)
+        return fig_font
+
+    def _glyph_rows(self, code:int) -> tuple:
+        """`(width, rows)` of a glyph for the lookup tables. `rows` are ints, the most significant bit is the left pixel."""
+        if(isinstance(self.bin_dic, GlyphStore)):
+            width, rows = self.bin_dic.width(code), self.bin_dic.rows(code)
+        else:
+            lines = self.bin_dic[code]
+            width, rows = len(lines[0]), [int(line, 2) for line in lines]
+        if(width % 8 != 0): raise ValueError(f"The width of U+{code:04X} is {width}, expected a multiple of 8")
+        return width, rows
+
+    @staticmethod
+    def _np_table(strs:list):
+        """
+        The table (`uint32` array) of unicode ordinals for `strs`. `None` if the lengths are different.\n\n\
+        Look it up by `table.take(keys, axis=0)`, which is much faster than `table[keys]`.
+        """
+        import numpy as np
+        if(len(set(map(len, strs))) != 1): return None
+        return np.array([[ord(c) for c in s] for s in strs], dtype=np.uint32)
+
+    def _draw_cells(self, ret_fig:Figfont, cell_w:int, cell_h:int, glyphs:tuple):
+        """
+        The cell-packing engine: draw every `cell_w`*`cell_h` pixels of a glyph as a cell `glyphs[index]`.\n\n\
+        The pixel at line `l`, column `c` of the cell is bit `l*cell_w + c` of `index`,\
+        so `glyphs` has `2**(cell_w*cell_h)` cells. The lines below the glyph are blank if 16 isn't a multiple of `cell_h`.\
+        The index of every cell is computed once for all the styles of the same cell size, see `generate_styles()`.
+
+        :param cell_w: The pixel columns of a cell, 1, 2 or 4.
+        :type cell_w: int
+        :param cell_h: The pixel lines of a cell.
+        :type cell_h: int
+        :param glyphs: The cells of every index.
+        :type glyphs: tuple
+        """
+        if(4 % cell_w != 0 or len(glyphs) != 1 << cell_w*cell_h):
+            raise ValueError(f"Expected 2**{cell_w*cell_h} glyphs of {cell_w}x{cell_h} cells, got {len(glyphs)}")
+        name = f"cells_{cell_w}x{cell_h}"
+        groups = self._bitmap_groups()
+        np_table = None if groups is None else self._np_table(glyphs)
+        if(np_table is not None):
+            import numpy as np
+            weight = (1 << np.arange(cell_w*cell_h, dtype=np.uint32)).reshape(cell_h, cell_w) # [line][column] => 2**bit
+            def render(bits):
+                n, height, width = bits.shape
+                if(height % cell_h): bits = np.pad(bits, ((0, 0), (0, -height % cell_h), (0, 0)))
+                cells = bits.reshape(n, -1, cell_h, width//cell_w, cell_w) # glyph, band, line, cell, column
+                return np.einsum("nbicj,ij->nbc", cells.astype(np.uint32), weight)
+            self._draw(ret_fig, name, render, lambda index: np_table.take(index, axis=0), vectorized=True)
+        else:
+            table = _cell_table(cell_w, cell_h, tuple(glyphs)) # every 4 pixels of `cell_h` lines
+            self._draw(ret_fig, name, functools.partial(_cell_keys, cell_h), _table_draw(table))
+    
+    @_profiled_style
     def ch_filling(self, ch_fill="\u2588\u2588", ch_blank="  ") -> Figfont: # ch_fill = "██" 
         """
         The normal font. Will only replace the 0-1 with other to generate.\n\n\
@@ -202,23 +1160,18 @@ class Generator_figfont:
         :return: A `Figfont` object. See Figfont.
         :rtype: Figfont
         """
-        ret_fig = Figfont(height=16, baseline=14, max_length=32+2)
-        iter_bin_dic = iter(self.bin_dic)
-        while True:
-            try:
-                i = next(iter_bin_dic)
-                ret_fig.font_dic.update(
-                    {i: list(map(
-                        lambda line:line.replace("1",ch_fill).replace("0",ch_blank),
-                        self.bin_dic[i]
-                    ))}
-                )
-            except StopIteration:
-                break
-        ret_fig.codetag_count = self.codetag_cnt
-        ret_fig.font_header = f"flf2a$ {self._attribute_str(ret_fig)}\n{ret_fig.font_comment}\n"
+        ret_fig = Figfont(height=16, baseline=14, max_length=2*self.max_width+2)
+        groups = self._bitmap_groups()
+        np_table = None if groups is None else self._np_table([ch_blank, ch_fill])
+        if(np_table is not None):
+            self._draw(ret_fig, "bits", lambda bits: bits, lambda bits: np_table.take(bits, axis=0), vectorized=True)
+        else:
+            table = _filling_table(ch_fill, ch_blank) # every 8 pixels of a line
+            self._draw(ret_fig, "bytes", _byte_keys, _table_draw(table))
+        self._set_header(ret_fig)
         return ret_fig
     
+    @_profiled_style
     def ch_half_block(self, corres:dict[str,dict[str, str]]={}) -> Figfont:
         """
         Just like `ch_filling`, but combine 2 lines to 1 line.\n\n\
@@ -237,25 +1190,14 @@ class Generator_figfont:
         FULL_BLOCK = "\u2588"
         if corres!={}: CH_CORRES = corres
         else: CH_CORRES = {"0":{"0":" ","1":LOWER_BLOCK},"1":{"0":UPPER_BLOCK,"1":FULL_BLOCK}}
-        ret_fig = Figfont(height=8, baseline=7, max_length=16+2)
-        iter_bin_dic = iter(self.bin_dic)
-        while True:
-            try:
-                i = next(iter_bin_dic)
-                font_whole = []
-                for line in range(0,16,2):
-                    font_line = "".join(list(map(
-                        lambda f1,f2: CH_CORRES[f1][f2],
-                        self.bin_dic[i][line], self.bin_dic[i][line+1] # the 0-1 from every 2 lines
-                    )))
-                    font_whole.append(font_line)
-                ret_fig.font_dic.update({i: font_whole})
-            except StopIteration:
-                break
-        ret_fig.codetag_count = self.codetag_cnt
-        ret_fig.font_header = f"flf2a$ {self._attribute_str(ret_fig)}\n{ret_fig.font_comment}\n"
+        ret_fig = Figfont(height=8, baseline=7, max_length=self.max_width+2)
+        # index = upper line + lower line * 2
+        cells = (CH_CORRES["0"]["0"], CH_CORRES["1"]["0"], CH_CORRES["0"]["1"], CH_CORRES["1"]["1"])
+        self._draw_cells(ret_fig, 1, 2, cells)
+        self._set_header(ret_fig)
         return ret_fig
     
+    @_profiled_style
     def ch_braille_dots(self) -> Figfont:
         """
         "Braille" font, show the glyph in "braille".\n\n\
@@ -291,31 +1233,51 @@ class Generator_figfont:
             [3, 0], #6
             [3, 1]  #7
         ]
-        ret_fig = Figfont(height=4, baseline=4, max_length=8+2)
-        iter_bin_dic = iter(self.bin_dic)
-        while True:
-            try:
-                i = next(iter_bin_dic)
-                font_whole = []
-                for line in range(0,16,4):
-                    font_length = len(self.bin_dic[i][line])
-                    font_line = ""
-                    for col in range(0, font_length, 2):
-                        res_ordinal = 0x2800
-                        for dot in range(0, 8):
-                            # [[1 or 0]] * 2**dot
-                            res_ordinal += int(self.bin_dic[i][line+BRAIL_OFFSET[dot][0]][col+BRAIL_OFFSET[dot][1]]) * (1 << dot)
-                        font_line += chr(res_ordinal)
-                    font_whole.append(font_line)
-                ret_fig.font_dic.update({i: font_whole})
-            except StopIteration:
-                break
+        ret_fig = Figfont(height=4, baseline=4, max_length=self.max_width//2+2)
+        cells = tuple(chr(0x2800 + sum(1 << dot for dot, (l_off, c_off) in enumerate(BRAIL_OFFSET) if index >> (l_off*2 + c_off) & 1))
+                      for index in range(256))
+        self._draw_cells(ret_fig, 2, 4, cells)
         ret_fig.font_comment += "\nThis font's idea is inspired by drawille <https://github.com/asciimoo/drawille>."
         ret_fig.comment_lines += 1
-        ret_fig.codetag_count = self.codetag_cnt
-        ret_fig.font_header = f"flf2a$ {self._attribute_str(ret_fig)}\n{ret_fig.font_comment}\n"
+        self._set_header(ret_fig)
         return ret_fig
     
+    @_profiled_style
+    def ch_quadrant_block(self) -> Figfont:
+        """
+        Like `ch_half_block`, but every character is 2*2 pixels, drawn with the quadrant blocks (U+2596-U+259F).\n\n\
+        The font is half as wide as `solid_box_small`.
+
+        :return: A `Figfont` object. See Figfont.
+        :rtype: Figfont
+        """
+        # index: upper left 1, upper right 2, lower left 4, lower right 8
+        QUADRANT_BLOCKS = " \u2598\u259D\u2580\u2596\u258C\u259E\u259B\u2597\u259A\u2590\u259C\u2584\u2599\u259F\u2588" # " ▘▝▀▖▌▞▛▗▚▐▜▄▙▟█"
+        ret_fig = Figfont(height=8, baseline=7, max_length=self.max_width//2+2)
+        self._draw_cells(ret_fig, 2, 2, tuple(QUADRANT_BLOCKS))
+        self._set_header(ret_fig)
+        return ret_fig
+
+    @_profiled_style
+    def ch_sextant_block(self) -> Figfont:
+        """
+        Every character is 2*3 pixels, drawn with the sextants of "Symbols for Legacy Computing" (U+1FB00-U+1FB3B).\n\n\
+        16 lines are drawn as 6, the last one is the upper third only. Needs a terminal font with the sextants.
+
+        :return: A `Figfont` object. See Figfont.
+        :rtype: Figfont
+        """
+        # index: the bit `line*2 + column` of the 3*2 pixels, the same as the sextant numbers (1 to 6) minus 1.
+        # U+1FB00 is sextant 1, the left and right halves (▌, ▐) aren't in the block, so they are skipped.
+        cells = tuple(" " if index == 0 else "\u2588" if index == 63 else "\u258C" if index == 21 else "\u2590" if index == 42
+                      else chr(0x1FB00 + index - 1 - (index > 21) - (index > 42))
+                      for index in range(64))
+        ret_fig = Figfont(height=6, baseline=5, max_length=self.max_width//2+2)
+        self._draw_cells(ret_fig, 2, 3, cells)
+        self._set_header(ret_fig)
+        return ret_fig
+
+    @_profiled_style
     def ch_box_drawing(self, style="bold", split_block=True) -> Figfont:
         """
         Use box drawing characters to draw every block.\n\n\
@@ -354,8 +1316,7 @@ class Generator_figfont:
             #"borad": ["─","╭","╮","╰","╯","├","┤","┬","┴","┼","│"]
             ##########  0 , 1 , 2 , 3 , 4 , 5 , 6 , 7 , 8 , 9 , 10
         }
-        ret_fig = Figfont(height=17, baseline=15, max_length=33+2)
-        iter_bin_dic = iter(self.bin_dic)
+        ret_fig = Figfont(height=17, baseline=15, max_length=2*self.max_width+1+2)
         if(style not in BT): # style not in BT.keys()
             raise ValueError(f"`style` agrument must be in {list(BT.keys())}")
         # Let me declare how the generator work, it's a bit complex.
@@ -465,108 +1426,1001 @@ class Generator_figfont:
         else:
             #      0b0000,0b0001=1,    0b0010=2,  0b0011=3,    0b0100=4,  0b0101=5,    0b0110=6,   0b0111=7,    0b1000=8,    0b1001=9,    0b1010=10,   1b1011=11, 0b1100=12,   0b1101=13, 0b1110=14,   0b1111=15
             boxt = ["  ", bs[3]+bs[0], bs[4]+" ", bs[0]+bs[0], bs[2]+" ", bs[9]+bs[0], bs[10]+" ", bs[1]+bs[0], bs[1]+bs[0], bs[10]+" ",  bs[9]+bs[0], bs[2]+" ", bs[0]+bs[0], bs[4]+" ", bs[3]+bs[0], "  "]
-        while True:
-            try:
-                i = next(iter_bin_dic)
-                font_whole = []
-                font_length = len(self.bin_dic[i][0])
-                # In the loop, the position is given(if the position isn't accessible, the value is 0<=>"0"):
-                ## line-1,col-1 | line-1,col
-                ## -------------+-----------
-                ##  line,col-1  |  line,col
-                # The variable name:
-                ## b | a
-                ## --+--
-                ## c | d
-                for line in range(0,16+1): # 0->16
-                    bi:list = self.bin_dic[i]
-                    font_line = ""
-                    for col in range(0, font_length+1): # 0->8 or 16
-                        # The code is a whole shit... Please forgive me.
-                        a=b=c=d=-1
-                        if(line-1 < 0) :      a=b=0
-                        if(col-1 < 0):      b=c=0
-                        if(line > 15):      c=d=0
-                        if(col>font_length-1):a=d=0
-                        if(a==-1): a=int(bi[line-1][col])
-                        if(b==-1): b=int(bi[line-1][col-1])
-                        if(c==-1): c=int(bi[line][col-1])
-                        if(d==-1): d=int(bi[line][col])
-                        # end of this
-                        font_line += boxt[a + b*2 + c*4 + d*8]
-                    font_line = font_line.removesuffix(" ") # The end of the line is like `┏━┳━┓ `, We should remove the ` ` suffix
-                    font_whole.append(font_line)
-                ret_fig.font_dic.update({i: font_whole})
-            except StopIteration:
-                break
-        ret_fig.codetag_count = self.codetag_cnt
-        ret_fig.font_header = f"flf2a$ {self._attribute_str(ret_fig)}\n{ret_fig.font_comment}\n"
+        groups = self._bitmap_groups()
+        np_table = None if groups is None else self._np_table(boxt)
+        if(np_table is not None):
+            import numpy as np
+            def neighbours(bits):
+                n, height, width = bits.shape
+                # Pad a blank line/column around the glyph, the pixels out of the glyph are 0.
+                pad = np.zeros((n, height+2, width+2), dtype=np.uint8)
+                pad[:, 1:-1, 1:-1] = bits
+                a = pad[:, :-1, 1:] # line-1,col
+                b = pad[:, :-1, :-1] # line-1,col-1
+                c = pad[:, 1:, :-1] # line,col-1
+                d = pad[:, 1:, 1:] # line,col
+                return a + b*2 + c*4 + d*8
+            def render(index):
+                cells = np_table.take(index, axis=0)
+                last = cells[:, :, -1, -1]
+                last[last == ord(" ")] = 0 # the same as `removesuffix(" ")` below
+                return cells
+            self._draw(ret_fig, "box_drawing", neighbours, render, vectorized=True)
+        else:
+            table = _box_drawing_table(tuple(boxt)) # every 4 cells of 2 lines
+            def draw(form):
+                width, lines = form
+                return ["".join(map(table.__getitem__, keys))[:(width+1)*2]
+                        .removesuffix(" ") # The end of the line is like `┏━┳━┓ `, We should remove the ` ` suffix
+                        for keys in lines]
+            self._draw(ret_fig, "box_drawing", _box_drawing_keys, draw)
+        self._set_header(ret_fig)
         return ret_fig
 
 
+class StyleChunks:
+    """
+    The glyphs of several styles, rendered together a chunk at a time by `Generator_figfont.generate_styles()`.\n\n\
+    `generate_flf()` reads the required characters first, so they are the first chunk and it's kept until the end.\
+    Of the other chunks, only the last one is kept. Every glyph is rendered once when the fonts are written in order.\
+    See `Generator_figfont.lazy_styles()`.
+
+    :param generator: The `Generator_figfont` of all glyphs.
+    :param styles: `[(func_name, kwargs), ...]`, like the values of `FONT_STYLES`.
+    :param chunk_size: How many glyphs to render at a time.
+    """
+    def __init__(self, generator:Generator_figfont, styles:list, chunk_size:int=512):
+        self.generator = generator
+        self.styles = styles
+        codes = list(generator.bin_dic)
+        required = [code for code in codes if is_ne_ch(code)]
+        others = [code for code in codes if not is_ne_ch(code)]
+        self.chunk_codes = ([required] if required else []) + [others[k:k+chunk_size] for k in range(0, len(others), chunk_size)]
+        self.codes = [code for chunk in self.chunk_codes for code in chunk] # in the order of `items()`
+        self.chunk_of = {code: chunk_k for chunk_k, chunk in enumerate(self.chunk_codes) for code in chunk}
+        self._pinned = 0 if required else None # the chunk of the required characters
+        self._chunks = OrderedDict() # chunk_k => [font_dic of every style]
+
+    def __len__(self) -> int:
+        return len(self.chunk_codes)
+
+    def font_dic(self, chunk_k:int, style_k:int) -> dict:
+        """The `{unicode: [lines]}` of chunk `chunk_k` in `styles[style_k]`."""
+        if(chunk_k in self._chunks):
+            self._chunks.move_to_end(chunk_k)
+        else:
+            sub_generator = self.generator._sub_generator(self.chunk_codes[chunk_k])
+            self._chunks[chunk_k] = [fig.font_dic for fig in sub_generator.generate_styles(self.styles)]
+            for old_k in [k for k in self._chunks if k not in (chunk_k, self._pinned)]: del self._chunks[old_k]
+        return self._chunks[chunk_k][style_k]
+
+
+class LazyFontDic(Mapping):
+    """
+    The `font_dic` of `Generator_figfont.lazy()`: `{unicode: [lines]}`, rendered chunk by chunk.\n\n\
+    `items()` yields the glyphs chunk by chunk, the required characters first, and keeps only\
+    a few chunks in memory, see `StyleChunks`.
+
+    :param chunks: The chunks of all glyphs.
+    :param style_k: The style of this font in `chunks.styles`.
+    """
+    def __init__(self, chunks:StyleChunks, style_k:int=0):
+        self.chunks = chunks
+        self.style_k = style_k
+
+    def __getitem__(self, code:int) -> list:
+        return self.chunks.font_dic(self.chunks.chunk_of[code], self.style_k)[code]
+
+    def items(self):
+        for chunk_k in range(len(self.chunks)):
+            yield from self.chunks.font_dic(chunk_k, self.style_k).items()
+
+    def __contains__(self, code) -> bool:
+        return code in self.chunks.chunk_of
+
+    def __iter__(self):
+        return iter(self.chunks.codes)
+
+    def __len__(self) -> int:
+        return len(self.chunks.codes)
+
+
+BLANK_CHARS = " \u2800" # The blank cells of the generators, the braille blank is a cell of `ch_braille_dots`
+HARD_BLANK = "$"
+
+def trim_glyph(lines:list, gap:int=1, hard_blank:str=HARD_BLANK) -> list:
+    """
+    Trim the blank columns on both sides of a glyph, and end every line with `gap` hardblanks.\n\n\
+    The blanks before and after the shape of every line are spaces, so a FIGdriver kerning the glyphs\
+    moves them together until the hardblanks touch, and the glyphs are `gap` columns apart at least.\
+    A blank glyph (e.g. the space) keeps its width, its spaces are hardblanks so they aren't kerned away.
+
+    :param lines: The lines of a glyph.
+    :type lines: list
+    :param gap: The hardblank columns at the end.
+    :type gap: int
+    :param hard_blank: The hardblank of the FIGfont.
+    :type hard_blank: str
+    :rtype: list
+    """
+    width = max(map(len, lines), default=0)
+    lines = [line.ljust(width) for line in lines]
+    stripped = [line.strip(BLANK_CHARS) for line in lines]
+    if(not any(stripped)): return [line.replace(" ", hard_blank) for line in lines]
+    left = min(len(line) - len(line.lstrip(BLANK_CHARS)) for line in lines)
+    right = min(len(line) - len(line.rstrip(BLANK_CHARS)) for line in lines)
+    width -= left + right
+    ret_arr = []
+    for line, shape in zip(lines, stripped):
+        if(not shape):
+            ret_arr.append(" " * (width + gap))
+            continue
+        lead = len(line) - left - len(line[left:].lstrip(BLANK_CHARS))
+        ret_arr.append((" " * lead + shape + hard_blank * gap).ljust(width + gap))
+    return ret_arr
+
+
+class TrimmedFontDic(Mapping):
+    """
+    A `font_dic` with the glyphs trimmed by `trim_glyph()` when they're read, see `Generator_figfont.trim()`.\n\n\
+    `bytes_before` and `bytes_after` count the UTF-8 bytes of the lines read by `items()`, for the size reduction.
+
+    :param font_dic: `{unicode: [lines]}`, e.g. a `LazyFontDic`.
+    :type font_dic: Mapping
+    :param gap: See `trim_glyph()`.
+    :type gap: int
+    """
+    def __init__(self, font_dic:Mapping, gap:int=1):
+        self.font_dic = font_dic
+        self.gap = gap
+        self.bytes_before = self.bytes_after = 0
+
+    def __getitem__(self, code:int) -> list:
+        return trim_glyph(self.font_dic[code], self.gap)
+
+    def items(self):
+        for code, lines in self.font_dic.items():
+            trimmed = trim_glyph(lines, self.gap)
+            self.bytes_before += sum(len(line.encode("utf-8")) for line in lines)
+            self.bytes_after += sum(len(line.encode("utf-8")) for line in trimmed)
+            yield code, trimmed
+
+    def __contains__(self, code) -> bool:
+        return code in self.font_dic
+
+    def __iter__(self):
+        return iter(self.font_dic)
+
+    def __len__(self) -> int:
+        return len(self.font_dic)
+
+
 ## To Binary String FigFont
-def generate_flf(output_flf:str, fig_font:Figfont):
+WRITE_BUFFER_SIZE = 1 << 20
+FLF_NEWLINE = os.linesep # The line break of the written fonts, like a text mode `open()` (the fonts in fig-fonts are CRLF)
+
+_LINE_BREAKS = set(map(ord, "\n\r\v\f\x1c\x1d\x1e\x85\u2028\u2029"))
+
+def _codetag_comment(code:int) -> str:
+    """The character itself, but not a line break or a surrogate (can't be UTF-8 encoded)."""
+    return "" if code in _LINE_BREAKS or 0xD800 <= code <= 0xDFFF else chr(code)
+
+@_profiled_flf
+def generate_flf(output_flf:str, fig_font:Figfont, compresslevel:int=None, write_index:bool=False):
     """
     Generate FIGfont file.\n\n
-    You're supposed to make sure the generated files are small enough to be read by the FIGdrivers.
+    You're supposed to make sure the generated files are small enough to be read by the FIGdrivers.\n\n\
+    `fig_font.font_dic` is read by `items()` once, so the glyphs of `Generator_figfont.lazy()`\
+    are rendered while writing.
     
     :param output_flf: Where the FIGfont file should be generate.
     :type output_flf: str
     :param fig_font: The Figfont instance object to generate FIGfont file.
     :type fig_font: Figfont
+    :param compresslevel: Optional. Write a ZIP-compressed FIGfont (allowed by the FIGfont spec,\
+        the font is the only file in the archive) with this deflate level, 0-9.
+    :type compresslevel: int
+    :param write_index: Optional. Also write the codetag index `output_flf + ".idx"` of a plain FIGfont,\
+        see `FlfIndex`. It's computed while writing, nothing is read again.
+    :type write_index: bool
     """
-    binary_str_file=open(output_flf, "w", encoding="utf-8")
-    binary_str_file.write(fig_font.font_header)
-    # begin required characters
-    for i in range(0x0020, 0x007E+1):
-        binary_str_file.write("@\n".join(fig_font.font_dic[i]) + "@@\n")
-    for i in range(0, 7): #[0x00C4,0x00D6,0x00DC,0x00E4,0x00F6,0x00FC,0x00DF]
-        binary_str_file.write("@\n"*(fig_font.height-1) + "@@\n")
-    # end required characters
-    # unrequired code tags(主要是中文字符)
-    iter_font_dic = iter(fig_font.font_dic)
-    while True:
+    for _ in _flf_writer(output_flf, fig_font, compresslevel, write_index): pass
+
+def generate_flfs(fonts:list, compresslevel:int=None, write_index:bool=False):
+    """
+    Generate several FIGfont files in lockstep, a glyph of every font at a time. See `generate_flf()`.\n\n\
+    The fonts of `Generator_figfont.lazy_styles()` are rendered while writing, a chunk for all of them at once.
+
+    :param fonts: `[(output_flf, fig_font), ...]`
+    :type fonts: list
+    """
+    if(_profiler is not None): # every font is profiled on its own
+        for output_flf, fig_font in fonts: generate_flf(output_flf, fig_font, compresslevel, write_index)
+        return
+    writers = [_flf_writer(output_flf, fig_font, compresslevel, write_index) for output_flf, fig_font in fonts]
+    for _ in itertools.zip_longest(*writers): pass
+
+def _flf_writer(output_flf:str, fig_font:Figfont, compresslevel:int=None, write_index:bool=False):
+    """`generate_flf()`, yield after the required characters and every code-tagged glyph."""
+    import zipfile
+    font_dic = fig_font.font_dic
+    nl = FLF_NEWLINE
+    glyph_bytes = lambda i: (f"@{nl}".join(font_dic[i]) + f"@@{nl}").encode("utf-8")
+    glyph_items = ((i, (f"@{nl}".join(lines) + f"@@{nl}").encode("utf-8")) for i, lines in font_dic.items())
+    # Write to a temporary file then rename, so a half-written font won't be left.
+    tmp_flf = f"{output_flf}.{os.getpid()}.tmp"
+    try:
+        with contextlib.ExitStack() as stack:
+            if(compresslevel is None):
+                binary_str_file = stack.enter_context(open(tmp_flf, "wb", buffering=WRITE_BUFFER_SIZE))
+            else:
+                zip_file = stack.enter_context(zipfile.ZipFile(tmp_flf, "w", zipfile.ZIP_DEFLATED, compresslevel=compresslevel))
+                binary_str_file = stack.enter_context(io.BufferedWriter(
+                    zip_file.open(path.basename(output_flf), "w"), WRITE_BUFFER_SIZE))
+            entries = {} # unicode => (byte offset, byte length) of the glyph lines
+            pos = binary_str_file.write(fig_font.font_header.replace("\n", nl).encode("utf-8"))
+            # begin required characters
+            for i in range(0x0020, 0x007E+1):
+                font_whole = glyph_bytes(i)
+                entries[i] = (pos, len(font_whole))
+                pos += binary_str_file.write(font_whole)
+            blank_whole = (f"@{nl}"*(fig_font.height-1) + f"@@{nl}").encode("utf-8")
+            for i in [0x00C4,0x00D6,0x00DC,0x00E4,0x00F6,0x00FC,0x00DF]:
+                entries[i] = (pos, len(blank_whole))
+                pos += binary_str_file.write(blank_whole)
+            # end required characters
+            yield
+            # unrequired code tags(主要是中文字符)
+            for i, font_whole in glyph_items:
+                if(is_ne_ch(i)): continue # the necessary font, skip
+                pos += binary_str_file.write(f"{hex(i)} {_codetag_comment(i)}{nl}".encode("utf-8"))
+                entries[i] = (pos, len(font_whole))
+                pos += binary_str_file.write(font_whole)
+                yield
+        os.replace(tmp_flf, output_flf)
+    except BaseException: # e.g. a glyph failed to render, or the writer is closed early
+        if(path.exists(tmp_flf)): os.remove(tmp_flf)
+        raise
+    if(write_index and compresslevel is None): FlfIndex.from_entries(entries).save(output_flf)
+
+
+class FlfIndex:
+    """
+    The codetag index of a plain FIGfont file: `{unicode: (byte offset, byte length)}` of the glyph lines,\
+    the end marks and the last line break included.\n\n\
+    A reader (see `render.MappedFlfFont`) seeks to the glyphs it needs instead of reading the whole file.\
+    It's only written on request, as `<font>.flf.idx` beside the font: by `generate_flf(..., write_index=True)`\
+    or `index_flf()`. Without it, the reader scans the font once in memory. Like the index of `Unifont`,\
+    it's stamped with the size and mtime of the font, a stale index isn't loaded.
+
+    :param codes: array("I"), sorted code points.
+    :param offsets: array("Q"), where the glyph lines of `codes[k]` start.
+    :param lengths: array("I"), the byte length of the glyph lines of `codes[k]`.
+    """
+    _MAGIC = b"FLIX"
+    _HEADER = struct.Struct("<4sQQI") # magic, font file size, font file mtime_ns, count
+
+    def __init__(self, codes:array, offsets:array, lengths:array):
+        self.codes = codes
+        self.offsets = offsets
+        self.lengths = lengths
+
+    @classmethod
+    def from_entries(cls, entries:dict) -> "FlfIndex":
+        """:param entries: `{unicode: (byte offset, byte length)}`"""
+        codes = array("I", sorted(entries))
+        return cls(codes, array("Q", (entries[i][0] for i in codes)), array("I", (entries[i][1] for i in codes)))
+
+    @classmethod
+    def scan(cls, data) -> "FlfIndex":
+        """
+        Index a FIGfont by reading it through once, the same way as `render.FlfFont` parses it.
+
+        :param data: The bytes (or mmap) of a plain FIGfont file.
+        :raise ValueError: If it isn't a FIGfont file.
+        """
+        size = len(data)
+        def line_end(pos:int) -> int:
+            end = data.find(b"\n", pos)
+            return size if end == -1 else end
+        end = line_end(0)
+        header = data[0:end].split()
+        if(len(header) < 6 or not header[0].startswith((b"flf2", b"tlf2"))): raise ValueError("Not a FIGfont file")
+        height = int(header[1])
+        pos = end + 1
+        for _ in range(int(header[5])): pos = line_end(pos) + 1 # skip the comment lines
+        entries = {}
+        def read_char(code:int):
+            nonlocal pos
+            start = pos
+            for _ in range(height): pos = min(line_end(pos) + 1, size)
+            entries[code] = (start, pos - start)
+        for code in range(0x0020, 0x007E+1): read_char(code)
+        if(pos < size):
+            for code in [0x00C4,0x00D6,0x00DC,0x00E4,0x00F6,0x00FC,0x00DF]: read_char(code)
+        while pos < size:
+            end = line_end(pos)
+            code_tag = data[pos:end].strip().split(b" ", 1)[0]
+            pos = end + 1
+            if(code_tag[:2].lower() == b"0x"): read_char(int(code_tag, 16))
+        return cls.from_entries(entries)
+
+    @classmethod
+    def load(cls, flf_file:str, index_file:str=None) -> "FlfIndex":
+        """The index saved by `save()`, `None` if it's missing or stale."""
+        if(index_file is None): index_file = flf_file + ".idx"
         try:
-            i = next(iter_font_dic)
-            if(is_ne_ch(i)): continue # the necessary font, skip
-            binary_str_file.write(f"{hex(i)} {chr(i)}\n" + "@\n".join(fig_font.font_dic[i]) + "@@\n")
-        except StopIteration:
-            break
-    binary_str_file.close()
+            stat = os.stat(flf_file)
+            with open(index_file, "rb") as f:
+                magic, size, mtime_ns, count = cls._HEADER.unpack(f.read(cls._HEADER.size))
+                if(magic != cls._MAGIC or (size, mtime_ns) != (stat.st_size, stat.st_mtime_ns)): return None
+                codes = array("I"); codes.fromfile(f, count)
+                offsets = array("Q"); offsets.fromfile(f, count)
+                lengths = array("I"); lengths.fromfile(f, count)
+        except (OSError, EOFError, struct.error):
+            return None
+        return cls(codes, offsets, lengths)
 
+    def save(self, flf_file:str, index_file:str=None):
+        """Save the index of `flf_file` (stamped with its current size and mtime). Skipped if it can't be written."""
+        if(index_file is None): index_file = flf_file + ".idx"
+        # Write to a temporary file then rename, so a broken index won't be left.
+        tmp_file = f"{index_file}.{os.getpid()}.tmp"
+        try:
+            stat = os.stat(flf_file)
+            with open(tmp_file, "wb") as f:
+                f.write(self._HEADER.pack(self._MAGIC, stat.st_size, stat.st_mtime_ns, len(self.codes)))
+                self.codes.tofile(f)
+                self.offsets.tofile(f)
+                self.lengths.tofile(f)
+            os.replace(tmp_file, index_file)
+        except OSError: # e.g. read-only directory, just don't save it
+            if(path.exists(tmp_file)): os.remove(tmp_file)
 
-if __name__ == "__main__":
-    default_bin_dic:dict = generate_bin_dic()
-    font_generator = Generator_figfont(default_bin_dic)
-    OUT_PREFIX = "fig-fonts/chinese_"
-    CUROUT = CURRENT_DIR+OUT_PREFIX 
-
-    font_solid_box_big = font_generator.ch_filling()
-    font_solid_box_small = font_generator.ch_half_block()
-    font_braille_dots = font_generator.ch_braille_dots()
-    generate_flf(output_flf=CUROUT+"solid_box_big.flf", fig_font=font_solid_box_big)
-    generate_flf(output_flf=CUROUT+"solid_box_small.flf", fig_font=font_solid_box_small)
-    generate_flf(output_flf=CUROUT+"braille_dots.flf", fig_font=font_braille_dots)
-
-    font_block_bold_split = font_generator.ch_box_drawing()
-    font_block_bold = font_generator.ch_box_drawing(split_block=False)
-    font_block_split = font_generator.ch_box_drawing(style="normal")
-    font_block = font_generator.ch_box_drawing(style="normal", split_block=False)
-    font_block_double_split = font_generator.ch_box_drawing(style="double")
-    font_block_double = font_generator.ch_box_drawing(style="double", split_block=False)
-    font_block_borad_split = font_generator.ch_box_drawing(style="borad")
-    font_block_borad = font_generator.ch_box_drawing(style="borad", split_block=False)
-    generate_flf(output_flf=CUROUT+"block_bold_split.flf", fig_font=font_block_bold_split)
-    generate_flf(output_flf=CUROUT+"block_bold.flf", fig_font=font_block_bold)
-    generate_flf(output_flf=CUROUT+"block_split.flf", fig_font=font_block_split)
-    generate_flf(output_flf=CUROUT+"block.flf", fig_font=font_block)
-    generate_flf(output_flf=CUROUT+"block_double_split.flf", fig_font=font_block_double_split)
-    generate_flf(output_flf=CUROUT+"block_double.flf", fig_font=font_block_double)
-    generate_flf(output_flf=CUROUT+"block_borad_split.flf", fig_font=font_block_borad_split)
-    generate_flf(output_flf=CUROUT+"block_borad.flf", fig_font=font_block_borad)
-
-    font_ascii_big = font_generator.ch_filling(ch_fill="#%", ch_blank=".,")
-    font_ascii_small = font_generator.ch_half_block(corres={"0":{"0":" ","1":","},"1":{"0":"'","1":";"}})
-    generate_flf(output_flf=CUROUT+"ascii_big.flf", fig_font=font_ascii_big)
-    generate_flf(output_flf=CUROUT+"ascii_small.flf", fig_font=font_ascii_small)
+    def find(self, code:int) -> tuple:
+        """`(byte offset, byte length)` of the glyph lines of `code`, `None` if it isn't in the font."""
+        k = bisect_left(self.codes, code)
+        if(k == len(self.codes) or self.codes[k] != code): return None
+        return self.offsets[k], self.lengths[k]
 
+    def __len__(self) -> int:
+        return len(self.codes)
+
+
+def index_flf(flf_file:str, index_file:str=None) -> FlfIndex:
+    """
+    The codetag index of a plain FIGfont file. It's scanned and saved (see `FlfIndex.save()`) if it's missing or stale.
+
+    :param flf_file: The plain FIGfont file.
+    :type flf_file: str
+    :param index_file: Optional. Default `flf_file + ".idx"`.
+    :type index_file: str
+    :rtype: FlfIndex
+    """
+    index = FlfIndex.load(flf_file, index_file)
+    if(index is None):
+        with open(flf_file, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            index = FlfIndex.scan(mm)
+        index.save(flf_file, index_file)
+    return index
+
+
+def compress_flf(input_flf:str, output_flf:str, compresslevel:int=9):
+    """
+    Write a ZIP-compressed copy of a FIGfont file. See `generate_flf()`.
+
+    :param input_flf: The plain FIGfont file.
+    :type input_flf: str
+    :param output_flf: Where the compressed FIGfont file should be generate. Can't be `input_flf`.
+    :type output_flf: str
+    :param compresslevel: The deflate level, 0-9.
+    :type compresslevel: int
+    """
+    import zipfile
+    tmp_flf = f"{output_flf}.{os.getpid()}.tmp"
+    try:
+        with zipfile.ZipFile(tmp_flf, "w", zipfile.ZIP_DEFLATED, compresslevel=compresslevel) as zip_file:
+            zip_file.write(input_flf, arcname=path.basename(output_flf))
+        os.replace(tmp_flf, output_flf)
+    except BaseException: # e.g. `input_flf` is missing
+        if(path.exists(tmp_flf)): os.remove(tmp_flf)
+        raise
+
+
+def read_flf(flf_file:str) -> str:
+    """Read a FIGfont file, plain or ZIP-compressed (the first file in the archive)."""
+    import zipfile
+    with open(flf_file, "rb") as f:
+        if(zipfile.is_zipfile(f)):
+            with zipfile.ZipFile(f) as zip_file:
+                data = zip_file.read(zip_file.namelist()[0])
+        else:
+            f.seek(0)
+            data = f.read()
+    return data.decode("utf-8")
+
+
+def font_report(flf_file:str) -> dict:
+    """
+    The size and load time of a FIGfont file.\n\n\
+    The load time is how long pyfiglet takes to load and parse it, if pyfiglet is installed.\
+    Otherwise, it's how long reading (and decompressing) and splitting the lines take.
+
+    :param flf_file: The FIGfont file, plain or ZIP-compressed.
+    :type flf_file: str
+    :return: `{"file", "size", "compressed", "load_seconds", "loader"}`
+    :rtype: dict
+    """
+    import zipfile
+    with open(flf_file, "rb") as f: compressed = zipfile.is_zipfile(f)
+    try:
+        import pyfiglet
+    except ImportError:
+        pyfiglet = None
+    start = time.perf_counter()
+    if(pyfiglet is not None):
+        # pyfiglet looks for `<font>.flf` under "./", it works with an absolute path
+        pyfiglet.FigletFont(font=path.splitext(path.abspath(flf_file))[0])
+    else:
+        read_flf(flf_file).splitlines()
+    return {"file": flf_file, "size": path.getsize(flf_file), "compressed": compressed,
+            "load_seconds": time.perf_counter() - start, "loader": "pyfiglet" if pyfiglet else "read"}
+
+
+## Fonts to build
+OUTPUT_DIR = CURRENT_DIR + "fig-fonts/"
+OUTPUT_PREFIX = "chinese_"
+FONT_STYLES = { # name => (generator function, arguments). The font is written to `OUTPUT_PREFIX + name + ".flf"`
+    "solid_box_big": ("ch_filling", {}),
+    "solid_box_small": ("ch_half_block", {}),
+    "braille_dots": ("ch_braille_dots", {}),
+    "quadrant_block": ("ch_quadrant_block", {}),
+    "sextant_block": ("ch_sextant_block", {}),
+    "block_bold_split": ("ch_box_drawing", {}),
+    "block_bold": ("ch_box_drawing", {"split_block": False}),
+    "block_split": ("ch_box_drawing", {"style": "normal"}),
+    "block": ("ch_box_drawing", {"style": "normal", "split_block": False}),
+    "block_double_split": ("ch_box_drawing", {"style": "double"}),
+    "block_double": ("ch_box_drawing", {"style": "double", "split_block": False}),
+    "block_borad_split": ("ch_box_drawing", {"style": "borad"}),
+    "block_borad": ("ch_box_drawing", {"style": "borad", "split_block": False}),
+    "ascii_big": ("ch_filling", {"ch_fill": "#%", "ch_blank": ".,"}),
+    "ascii_small": ("ch_half_block", {"corres": {"0":{"0":" ","1":","},"1":{"0":"'","1":";"}}}),
+}
+
+GENERATOR_VERSION = "1" # Change it when the output of any generator changes, so the build cache is not used
+CACHE_DIR = CURRENT_DIR + ".cache/"
+
+
+## Build cache
+class BuildCache:
+    """
+    Content-addressed cache for `build_fonts()`.\n\n\
+    - A font is skipped if its key (glyphs, style, `GENERATOR_VERSION`) is the same as the last build\
+      and the output file isn't changed since then.
+    - Every rendered glyph is cached by the glyph bitmap and the style, so only the new or changed\
+      glyphs are rendered if the character file or unifont is changed.
+
+    :param cache_dir: Where the cache is stored.
+    :type cache_dir: str
+    """
+    def __init__(self, cache_dir:str=CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.stamp_file = path.join(cache_dir, "fonts.json")
+
+    @staticmethod
+    def style_key(name:str) -> str:
+        func_name, kwargs = FONT_STYLES[name]
+        style = json.dumps([GENERATOR_VERSION, func_name, kwargs], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(style.encode("utf-8")).hexdigest()
+
+    @classmethod
+    def font_key(cls, name:str, store_digest:str, trim:bool=False) -> str:
+        trimmed = " trim" if trim else ""
+        return hashlib.sha256(f"{cls.style_key(name)} {store_digest}{trimmed}".encode("ascii")).hexdigest()
+
+    def _load_stamps(self) -> dict:
+        try:
+            with open(self.stamp_file, "r", encoding="utf-8") as f: return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def is_fresh(self, output_flf:str, font_key:str) -> bool:
+        stamp = self._load_stamps().get(path.abspath(output_flf))
+        if(stamp is None or stamp["key"] != font_key): return False
+        try:
+            stat = os.stat(output_flf)
+        except OSError:
+            return False
+        return [stat.st_size, stat.st_mtime_ns] == [stamp["size"], stamp["mtime_ns"]]
+
+    def mark(self, output_flf:str, font_key:str):
+        stamps = self._load_stamps()
+        stat = os.stat(output_flf)
+        stamps[path.abspath(output_flf)] = {"key": font_key, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        _atomic_write(self.stamp_file, json.dumps(stamps, indent=0).encode("utf-8"))
+
+    def _glyph_file(self, name:str) -> str:
+        return path.join(self.cache_dir, "glyphs", self.style_key(name) + ".pickle")
+
+    def load_glyphs(self, name:str) -> dict:
+        """`{glyph key: rendered lines}` of style `name`, see `GlyphStore.key()`."""
+        try:
+            with open(self._glyph_file(name), "rb") as f: return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return {}
+
+    def save_glyphs(self, name:str, glyphs:dict):
+        _atomic_write(self._glyph_file(name), pickle.dumps(glyphs, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def _atomic_write(file:str, data:bytes):
+    os.makedirs(path.dirname(file), exist_ok=True)
+    tmp_file = f"{file}.{os.getpid()}.tmp"
+    with open(tmp_file, "wb") as f: f.write(data)
+    os.replace(tmp_file, file)
+
+
+## Build fonts
+_worker_generator:Generator_figfont = None # The generator shared by the build processes
+
+def _init_build_worker(bin_dic:GlyphStore=None):
+    global _worker_generator
+    if(bin_dic is not None): # spawned, not forked
+        _worker_generator = Generator_figfont(bin_dic)
+
+def _build_styles(names:list, output_dir:str, cache_dir:str=None, trim:bool=False) -> list:
+    """
+    Build the fonts of the styles `names` in one pass, see `Generator_figfont.generate_styles()`.
+
+    :return: `[(name, output file, seconds, status)]`
+    """
+    output_flfs = {name: path.join(output_dir, OUTPUT_PREFIX + name + ".flf") for name in names}
+    start = time.perf_counter()
+    results = []
+    def finish(name:str, fig_font:Figfont, status:str):
+        if(trim): status += f", trimmed {_trim_report(fig_font.font_dic)}"
+        if(len(names) > 1): status += f", in one pass of {len(names)} styles"
+        results.append((name, output_flfs[name], time.perf_counter() - start, status))
+    if(cache_dir is None):
+        fig_fonts = _worker_generator.lazy_styles([FONT_STYLES[name] for name in names])
+        if(trim):
+            for fig_font in fig_fonts: _worker_generator.trim(fig_font)
+        generate_flfs([(output_flfs[name], fig_font) for name, fig_font in zip(names, fig_fonts)])
+        for name, fig_font in zip(names, fig_fonts): finish(name, fig_font, f"{len(fig_font.font_dic)} glyphs rendered")
+    else:
+        for name, fig_font, status in _build_styles_cached(names, BuildCache(cache_dir)):
+            if(trim): _worker_generator.trim(fig_font)
+            generate_flf(output_flfs[name], fig_font)
+            finish(name, fig_font, status)
+    return results
+
+def _trim_report(font_dic:TrimmedFontDic) -> str:
+    before, after = font_dic.bytes_before, font_dic.bytes_after
+    return f"{before} -> {after} Bytes of glyph lines ({(after/before - 1)*100 if before else 0:+.1f}%)"
+
+def _build_styles_cached(names:list, cache:BuildCache):
+    """Yield `(name, fig_font, status)` of the styles `names`, only the glyphs not in `cache` are rendered."""
+    store:GlyphStore = _worker_generator.bin_dic
+    keys = {i: store.key(i) for i in store}
+    def finish(name:str, sub_fig:Figfont, glyphs:dict, missing:list) -> tuple:
+        for i in missing: glyphs[keys[i]] = sub_fig.font_dic[i]
+        if(missing): cache.save_glyphs(name, glyphs)
+        sub_fig.font_dic = {i: glyphs[keys[i]] for i in store}
+        _worker_generator._set_header(sub_fig)
+        return name, sub_fig, f"{len(missing)} of {len(store)} glyphs rendered"
+    passes = {} # missing glyphs => [(name, glyphs)]
+    for name in names:
+        glyphs = cache.load_glyphs(name)
+        missing = tuple(i for i in store if keys[i] not in glyphs)
+        if(missing):
+            passes.setdefault(missing, []).append((name, glyphs))
+        else: # Render one glyph to get the Figfont header.
+            header_generator = Generator_figfont(store.subset(store.codes[:1]), False, _worker_generator.max_width)
+            header_generator.profiled = False
+            yield finish(name, getattr(header_generator, FONT_STYLES[name][0])(**FONT_STYLES[name][1]), glyphs, missing)
+    # Render the missing glyphs only, in one pass for the styles missing the same glyphs.
+    for missing, pass_styles in passes.items():
+        sub_figs = Generator_figfont(store.subset(missing), max_width=_worker_generator.max_width).generate_styles([FONT_STYLES[name] for name, _ in pass_styles])
+        for (name, glyphs), sub_fig in zip(pass_styles, sub_figs):
+            yield finish(name, sub_fig, glyphs, missing)
+
+
+def _plan_passes(styles:list, jobs:int) -> list:
+    """
+    Group `styles` to `jobs` batches, every batch is built in one pass by a process, see `_build_styles()`.\n\n\
+    The styles of a generator function share the most (see `Generator_figfont._draw()`), so they're grouped\
+    by the function first. Then the smallest groups are merged, or the biggest ones are split, to have `jobs` batches.
+    """
+    batches = {}
+    for name in styles: batches.setdefault(FONT_STYLES[name][0], []).append(name)
+    batches = sorted(batches.values(), key=len)
+    while len(batches) > jobs:
+        batches = sorted([batches[0] + batches[1]] + batches[2:], key=len)
+    while len(batches) < jobs and len(batches[-1]) > 1:
+        batch = batches.pop()
+        batches = sorted(batches + [batch[:len(batch)//2], batch[len(batch)//2:]], key=len)
+    return batches
+
+
+def build_fonts(bin_dic:GlyphStore, styles:list=None, output_dir:str=OUTPUT_DIR, jobs:int=None,
+                cache_dir:str=CACHE_DIR, trim:bool=False):
+    """
+    Generate FIGfont files of `styles`, in parallel.\n\n\
+    The styles are grouped to `jobs` batches (see `_plan_passes()`), every batch is built and written by a worker\
+    process in one pass over the glyphs (see `Generator_figfont.generate_styles()`). The glyphs are decoded only once:\
+    the workers are forked, so they share `bin_dic` (copy-on-write). If `fork` isn't available,\
+    `bin_dic` is sent to each worker once.
+
+    :param bin_dic: Generated by `generate_bin_dic()`.
+    :type bin_dic: GlyphStore
+    :param styles: The names in `FONT_STYLES`. Default all.
+    :type styles: list
+    :param output_dir: Where the FIGfont files should be generate.
+    :type output_dir: str
+    :param jobs: How many processes. Default `os.cpu_count()`, `1` to build in this process.
+    :type jobs: int
+    :param cache_dir: The directory of `BuildCache`. `None` to build everything from scratch.
+    :type cache_dir: str
+    :param trim: Trim the blank margins of the glyphs and kern them, see `Generator_figfont.trim()`.
+    :type trim: bool
+    :return: A generator of `(name, output file, seconds, status)`, in the order of finishing.
+    """
+    import multiprocessing
+    global _worker_generator
+    if(styles is None): styles = list(FONT_STYLES)
+    for name in styles:
+        if(name not in FONT_STYLES): raise ValueError(f"Unknown style `{name}`, expected in {list(FONT_STYLES)}")
+    os.makedirs(output_dir, exist_ok=True)
+    font_keys = {}
+    if(cache_dir is not None):
+        cache = BuildCache(cache_dir)
+        store_digest = bin_dic.digest()
+        todo = []
+        for name in styles:
+            output_flf = path.join(output_dir, OUTPUT_PREFIX + name + ".flf")
+            font_keys[name] = BuildCache.font_key(name, store_digest, trim)
+            if(cache.is_fresh(output_flf, font_keys[name])): yield name, output_flf, 0.0, "up to date"
+            else: todo.append(name)
+        styles = todo
+        if(not styles): return
+    if(jobs is None): jobs = os.cpu_count() or 1
+    if(_profiler is not None): jobs = 1 # the stages are recorded in this process, and not slowed by each other
+    jobs = max(1, min(jobs, len(styles)))
+    _worker_generator = Generator_figfont(bin_dic)
+    # When profiling, every style is built on its own.
+    batches = [[name] for name in styles] if _profiler is not None else _plan_passes(styles, jobs)
+    if(jobs == 1):
+        results = (result for batch in batches for result in _build_styles(batch, output_dir, cache_dir, trim))
+    elif("fork" in multiprocessing.get_all_start_methods()):
+        results = _build_in_pool(batches, output_dir, cache_dir, trim, jobs, multiprocessing.get_context("fork"), ())
+    else:
+        results = _build_in_pool(batches, output_dir, cache_dir, trim, jobs, multiprocessing.get_context("spawn"), (bin_dic,))
+    for result in results:
+        if(cache_dir is not None): cache.mark(result[1], font_keys[result[0]])
+        yield result
+
+def _build_in_pool(batches:list, output_dir:str, cache_dir:str, trim:bool, jobs:int, mp_context, initargs:tuple):
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    with ProcessPoolExecutor(max_workers=jobs, mp_context=mp_context,
+                             initializer=_init_build_worker, initargs=initargs) as executor:
+        futures = [executor.submit(_build_styles, batch, output_dir, cache_dir, trim) for batch in batches]
+        for future in as_completed(futures):
+            yield from future.result()
+
+
+def style_report(bin_dic:GlyphStore, styles:list=None) -> dict:
+    """
+    The glyph size and render time of every style, without writing the fonts.\n\n\
+    The size is the UTF-8 bytes of the glyph lines and end marks, as written by `generate_flf()`\
+    (the header and the code tags are the same for every style).
+
+    :param bin_dic: Generated by `generate_bin_dic()`.
+    :type bin_dic: GlyphStore
+    :param styles: The names in `FONT_STYLES`. Default all.
+    :type styles: list
+    :return: `{name: {"seconds", "bytes", "height", "max_length"}}`
+    :rtype: dict
+    """
+    if(styles is None): styles = list(FONT_STYLES)
+    ret_dic = {}
+    for name in styles:
+        func_name, kwargs = FONT_STYLES[name]
+        generator = Generator_figfont(bin_dic)
+        generator._bitmap_groups() # the bitmaps are decoded once for every style, not a part of the style
+        start = time.perf_counter()
+        fig_font = getattr(generator, func_name)(**kwargs)
+        seconds = time.perf_counter() - start
+        size = sum(len(("@\n".join(lines) + "@@\n").encode("utf-8")) for lines in fig_font.font_dic.values())
+        ret_dic[name] = {"seconds": seconds, "bytes": size, "height": fig_font.height, "max_length": fig_font.max_length}
+    return ret_dic
+
+
+## Sharded fonts
+def plan_shards(codes:list, hot_codes:list=(), cold_size:int=1000) -> list:
+    """
+    Split the glyphs of a font to shards: a small "hot" shard and several "cold" shards.
+
+    :param codes: All code points of the font, e.g. `list(bin_dic)`.
+    :type codes: list
+    :param hot_codes: The code points should be in the hot shard, e.g. the most frequent characters.\
+        The necessary characters (see `is_ne_ch()`) and `FLF_SCOPE_ARR` are always in it.
+    :type hot_codes: list
+    :param cold_size: The max number of glyphs of a cold shard. The cold shards are split by\
+        code point, so every cold shard covers one range.
+    :type cold_size: int
+    :return: `[hot codes, cold codes, cold codes, ...]`
+    :rtype: list
+    """
+    hot_set = set(hot_codes)
+    for scope in FLF_SCOPE_ARR: hot_set.update(range(scope[0], scope[1]+1))
+    hot, cold = [], []
+    for i in codes:
+        if(is_ne_ch(i) or i == 0 or i in hot_set): hot.append(i)
+        else: cold.append(i)
+    cold.sort()
+    return [hot] + [cold[k:k+cold_size] for k in range(0, len(cold), cold_size)]
+
+
+def _merge_ranges(codes:list) -> list:
+    ret_arr = []
+    for i in sorted(codes):
+        if(ret_arr and i == ret_arr[-1][1] + 1): ret_arr[-1][1] = i
+        else: ret_arr.append([i, i])
+    return ret_arr
+
+
+def build_shards(bin_dic:GlyphStore, name:str, hot_codes:list=(), cold_size:int=1000, output_dir:str=OUTPUT_DIR) -> str:
+    """
+    Generate a style as sharded FIGfont files and a manifest.\n\n\
+    Every shard is a complete FIGfont (with the necessary characters). The manifest\
+    `<prefix><name>.shards.json` maps code point ranges to shards, the hot shard first:
+
+    ```
+    {"style": name, "height": 4, "shards": [{"file": "chinese_braille_dots-hot.flf", "ranges": [[32, 126], ...]}, ...]}
+    ```
+
+    :param bin_dic: Generated by `generate_bin_dic()`.
+    :type bin_dic: GlyphStore
+    :param name: A name in `FONT_STYLES`.
+    :type name: str
+    :param hot_codes: See `plan_shards()`.
+    :param cold_size: See `plan_shards()`.
+    :param output_dir: Where the FIGfont files should be generate.
+    :type output_dir: str
+    :return: The manifest file.
+    :rtype: str
+    """
+    func_name, kwargs = FONT_STYLES[name]
+    os.makedirs(output_dir, exist_ok=True)
+    shards = []
+    for k, codes in enumerate(plan_shards(list(bin_dic), hot_codes, cold_size)):
+        shard_file = f"{OUTPUT_PREFIX}{name}-{'hot' if k == 0 else f'cold{k}'}.flf"
+        # A cold shard needs the necessary characters too, to be a complete FIGfont.
+        shard_codes = codes if k == 0 else codes + [i for i in bin_dic if is_ne_ch(i)]
+        fig_font = Generator_figfont(bin_dic.subset(shard_codes)).lazy(func_name, **kwargs)
+        generate_flf(path.join(output_dir, shard_file), fig_font)
+        # The cold shards are split by code point, so a range covers all of a cold shard.
+        shards.append({"file": shard_file, "ranges": _merge_ranges(codes) if k == 0 else [[codes[0], codes[-1]]]})
+    manifest = {"style": name, "height": fig_font.height, "shards": shards}
+    manifest_file = path.join(output_dir, f"{OUTPUT_PREFIX}{name}.shards.json")
+    _atomic_write(manifest_file, json.dumps(manifest, ensure_ascii=False).encode("utf-8"))
+    return manifest_file
+
+
+def build_range_shards(flf_scope_arr:list=None, styles:list=None, font_source:Mapping=None, shard_size:int=1000,
+                       output_dir:str=OUTPUT_DIR, jobs:int=None, trim:bool=False):
+    """
+    Generate whole Unicode blocks (or all of unifont) as sharded FIGfonts, see `build_shards()`.\n\n\
+    The code points are split by range: the hot shard has the necessary characters only, every cold shard\
+    has `shard_size` code points in a row. The glyphs are read, decoded, rendered and written one shard at\
+    a time (every shard is decoded once for all `styles`), so the memory doesn't grow with the number of glyphs.
+
+    :param flf_scope_arr: The code points, e.g. `[[0x4E00, 0x9FFF]]`. The code points not in `font_source`\
+        get the "missing character" glyph, see `generate_bin_dic()`. Default every glyph in `font_source`.
+    :type flf_scope_arr: list
+    :param styles: The names in `FONT_STYLES`. Default all.
+    :type styles: list
+    :param font_source: Where to get the hex strings. Default `open_unifont()`.
+    :type font_source: Mapping
+    :param shard_size: The max number of glyphs of a cold shard.
+    :type shard_size: int
+    :param output_dir: Where the FIGfont files should be generate.
+    :type output_dir: str
+    :param jobs: How many processes build the shards. Default `os.cpu_count()`. Only `1` if `fork` isn't available.
+    :type jobs: int
+    :param trim: See `build_fonts()`.
+    :type trim: bool
+    :return: `{name: manifest file}`
+    :rtype: dict
+    """
+    import multiprocessing
+    global _worker_font_source
+    if(styles is None): styles = list(FONT_STYLES)
+    for name in styles:
+        if(name not in FONT_STYLES): raise ValueError(f"Unknown style `{name}`, expected in {list(FONT_STYLES)}")
+    if(font_source is None): font_source = open_unifont()
+    if(flf_scope_arr is None): codes = sorted(font_source)
+    else: codes = sorted({i for scope in flf_scope_arr for i in range(scope[0], scope[1]+1)})
+    codes = [i for i in codes if not is_ne_ch(i) and i != 0] # in every shard
+    chunks = [[]] + [codes[k:k+shard_size] for k in range(0, len(codes), shard_size)]
+    os.makedirs(output_dir, exist_ok=True)
+    _worker_font_source = font_source
+    if(jobs is None): jobs = os.cpu_count() or 1
+    if(_profiler is not None or "fork" not in multiprocessing.get_all_start_methods()): jobs = 1
+    jobs = max(1, min(jobs, len(chunks)))
+    if(jobs == 1):
+        results = [_build_range_shard(chunk, styles, output_dir, trim) for chunk in chunks]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context("fork")) as executor:
+            results = list(executor.map(_build_range_shard, chunks, itertools.repeat(styles), itertools.repeat(output_dir),
+                                        itertools.repeat(trim)))
+    manifest_files = {}
+    for name in styles:
+        shards = [{"file": result[name][0], "ranges": [[chunk[0], chunk[-1]]] if chunk else [[0, 0], [0x0020, 0x007E]]}
+                  for chunk, result in zip(chunks, results)]
+        manifest = {"style": name, "height": results[0][name][1], "shards": shards}
+        manifest_files[name] = path.join(output_dir, f"{OUTPUT_PREFIX}{name}.shards.json")
+        _atomic_write(manifest_files[name], json.dumps(manifest, ensure_ascii=False).encode("utf-8"))
+    return manifest_files
+
+_worker_font_source:Mapping = None # The font source shared by the processes of `build_range_shards()`
+
+def _build_range_shard(codes:list, styles:list, output_dir:str, trim:bool=False) -> dict:
+    """Decode a shard and write it in every style. Return `{name: (shard file, height)}`."""
+    generator = Generator_figfont(generate_bin_dic(_merge_ranges(codes), _worker_font_source, missing_to_zero=True))
+    shard_files = [f"{OUTPUT_PREFIX}{name}-{f'{codes[0]:04X}-{codes[-1]:04X}' if codes else 'hot'}.flf" for name in styles]
+    fig_fonts = generator.lazy_styles([FONT_STYLES[name] for name in styles]) # rendered in one pass, see `generate_flfs()`
+    if(trim):
+        for fig_font in fig_fonts: generator.trim(fig_font)
+    generate_flfs([(path.join(output_dir, shard_file), fig_font) for shard_file, fig_font in zip(shard_files, fig_fonts)])
+    return {name: (shard_file, fig_font.height) for name, shard_file, fig_font in zip(styles, shard_files, fig_fonts)}
+
+
+def _finish_profiling(report_file:str):
+    profiler = disable_profiling()
+    profiler.write(report_file)
+    print(profiler.summary())
+    print(f"Profile report: {report_file}")
+
+
+def main(argv:list=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Generate FIGfonts from unifont glyphs.")
+    parser.add_argument("styles", nargs="*", metavar="STYLE",
+                        help=f"Styles to build, default all. Choices: {', '.join(FONT_STYLES)}")
+    parser.add_argument("-s", "--scope-file", default=INPUT_SP_CHINESE_CH_FILE,
+                        help="Character file (one character per line) added to FLF_SCOPE_ARR. Default: %(default)s")
+    # The options of several values are repeated (`-r 4E00-9FFF -r 3400-4DBF`), so they don't take the STYLEs after them.
+    parser.add_argument("-c", "--corpus", action="append", metavar="FILE", default=None,
+                        help="Subset mode: only the characters used in this text file (`-` for stdin), "
+                             "instead of FLF_SCOPE_ARR and the scope file. Repeat for more files")
+    parser.add_argument("--min-count", type=int, default=1,
+                        help="Subset mode: only the characters used at least this many times. Default: %(default)s")
+    parser.add_argument("--shard", action="store_true",
+                        help="Write every style as a hot shard and cold shards with a manifest (`*.shards.json`)")
+    parser.add_argument("--hot", action="append", metavar="FILE", default=[],
+                        help="Shard mode: a text file to count the character frequency, the most frequent go to the hot shard. "
+                             "Repeat for more files")
+    parser.add_argument("--hot-size", type=int, default=500,
+                        help="Shard mode: how many frequent characters go to the hot shard. Default: %(default)s")
+    parser.add_argument("--cold-size", type=int, default=1000,
+                        help="Shard mode: max glyphs of a cold shard. Default: %(default)s")
+    parser.add_argument("-r", "--range", action="append", metavar="START-STOP", default=None,
+                        help="Block mode: generate the code point ranges (hex, e.g. 4E00-9FFF, comma-separated or repeated) "
+                             "as range-sharded fonts, one shard (see --cold-size) at a time. "
+                             "The missing code points get the missing character glyph")
+    parser.add_argument("--all", action="store_true", help="Block mode: generate every glyph in the hex files")
+    parser.add_argument("--hex", action="append", metavar="FILE", default=None,
+                        help=f"A unifont .hex file, repeat for more. Default: {INPUT_FILE}, "
+                             f"and {INPUT_UPPER_FILE} in block mode if it exists")
+    parser.add_argument("-o", "--output-dir", default=None,
+                        help=f"Default: {OUTPUT_DIR}, {OUTPUT_DIR}subset/ in subset mode or {OUTPUT_DIR}blocks/ in block mode")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="Worker processes. Default: CPU count")
+    parser.add_argument("--cache-dir", default=CACHE_DIR, help="Build cache directory. Default: %(default)s")
+    parser.add_argument("--no-cache", action="store_true", help="Build everything from scratch, don't use the cache")
+    parser.add_argument("--trim", action="store_true",
+                        help="Trim the blank margins of the glyphs, and set the layout to kerning (see `Generator_figfont.trim()`)")
+    parser.add_argument("--index", action="store_true",
+                        help="Also write the codetag index (`<font>.flf.idx`, see `FlfIndex`) of every plain font, "
+                             "so `render.MappedFlfFont` doesn't scan the font")
+    parser.add_argument("-z", "--zip-dir", default=None,
+                        help="Also write ZIP-compressed fonts (same file names) to this directory")
+    parser.add_argument("--zip-level", type=int, default=9, choices=range(0, 10), metavar="0-9",
+                        help="Deflate level of the compressed fonts. Default: %(default)s")
+    parser.add_argument("--report", action="store_true", help="Report the size and load time of every font")
+    parser.add_argument("--style-report", action="store_true",
+                        help="Only report the glyph size and render time of every style, don't write the fonts")
+    parser.add_argument("--profile", default=None, metavar="FILE",
+                        help="Profile the generators and write the report (JSON) to FILE, in one process. "
+                             "Use with --no-cache to profile every style")
+    parser.add_argument("--profile-dir", default=None, help="Profile mode: also write the cProfile dump of every stage here")
+    parser.add_argument("--profile-slowest", type=int, default=10, metavar="N",
+                        help="Profile mode: report the N slowest glyphs of every style, timed from a sample. 0 to skip. "
+                             "Default: %(default)s")
+    parser.add_argument("--profile-no-memory", action="store_true",
+                        help="Profile mode: don't trace the peak memory (tracemalloc slows everything down)")
+    args = parser.parse_args(argv)
+    for name in args.styles:
+        if(name not in FONT_STYLES): parser.error(f"unknown style `{name}`")
+    if(args.profile is not None): enable_profiling(args.profile_dir, args.profile_slowest, not args.profile_no_memory)
+    elif(args.profile_dir is not None): parser.error("--profile-dir needs --profile")
+
+    start = time.perf_counter()
+    if(args.range is not None or args.all):
+        try:
+            flf_scope_arr = None if args.all else [parse_range(text) for value in args.range for text in value.split(",")]
+        except ValueError as e:
+            parser.error(str(e))
+        output_dir = OUTPUT_DIR + "blocks/" if args.output_dir is None else args.output_dir
+        manifest_files = build_range_shards(flf_scope_arr, args.styles or None, open_unifont(args.hex), args.cold_size,
+                                            output_dir, args.jobs, args.trim)
+        for name, manifest_file in manifest_files.items():
+            with open(manifest_file, "r", encoding="utf-8") as f: shards = json.load(f)["shards"]
+            if(args.index):
+                for shard in shards: index_flf(path.join(output_dir, shard["file"]))
+            size = sum(path.getsize(path.join(output_dir, shard["file"])) for shard in shards)
+            print(f"{name}: {manifest_file} ({len(shards)-1} shards, {size} Bytes)")
+        print(f"Done in {time.perf_counter() - start:.2f}s")
+        if(args.profile is not None): _finish_profiling(args.profile)
+        return
+    font_source = dic if args.hex is None else open_unifont(args.hex)
+    if(args.corpus is None):
+        flf_scope_arr = get_flf_scope_arr(args.scope_file)
+    else:
+        with contextlib.ExitStack() as stack:
+            texts = [sys.stdin if file == "-" else stack.enter_context(open(file, "r", encoding="utf-8"))
+                     for file in args.corpus]
+            flf_scope_arr = read_corpus_scope(texts, args.min_count, font_source)
+        print(f"{len(flf_scope_arr)} distinct characters in the corpus")
+        if(args.output_dir is None): args.output_dir = OUTPUT_DIR + "subset/"
+    if(args.output_dir is None): args.output_dir = OUTPUT_DIR
+    bin_dic = generate_bin_dic(flf_scope_arr, font_source)
+    print(f"{len(bin_dic)} glyphs decoded in {time.perf_counter() - start:.2f}s")
+    if(args.style_report):
+        reports = style_report(bin_dic, args.styles or None)
+        base_name = "solid_box_big" if "solid_box_big" in reports else max(reports, key=lambda name: reports[name]["bytes"])
+        for name, report in reports.items():
+            print(f"{name}: {report['bytes']} Bytes ({report['bytes'] / reports[base_name]['bytes']:.0%} of {base_name}), "
+                  f"{report['height']} lines, rendered in {report['seconds']:.3f}s")
+        return
+    if(args.shard):
+        with contextlib.ExitStack() as stack:
+            hot_codes = read_hot_codes([stack.enter_context(open(file, "r", encoding="utf-8")) for file in args.hot], args.hot_size)
+        for name in args.styles or FONT_STYLES:
+            manifest_file = build_shards(bin_dic, name, hot_codes, args.cold_size, args.output_dir)
+            with open(manifest_file, "r", encoding="utf-8") as f: shards = json.load(f)["shards"]
+            if(args.index):
+                for shard in shards: index_flf(path.join(args.output_dir, shard["file"]))
+            sizes = [path.getsize(path.join(args.output_dir, shard["file"])) for shard in shards]
+            print(f"{name}: {manifest_file} (hot {sizes[0]} Bytes, {len(sizes)-1} cold shards {sum(sizes[1:])} Bytes)")
+        print(f"Done in {time.perf_counter() - start:.2f}s")
+        if(args.profile is not None): _finish_profiling(args.profile)
+        return
+    cache_dir = None if args.no_cache else args.cache_dir
+    built = []
+    for name, output_flf, seconds, status in build_fonts(bin_dic, args.styles or None, args.output_dir, args.jobs, cache_dir,
+                                                         args.trim):
+        print(f"{name}: {output_flf} ({path.getsize(output_flf)} Bytes, {seconds:.2f}s, {status})")
+        built.append(output_flf)
+    if(args.index):
+        for output_flf in built: index_flf(output_flf)
+    if(args.zip_dir is not None):
+        os.makedirs(args.zip_dir, exist_ok=True)
+        for output_flf in built:
+            zip_flf = path.join(args.zip_dir, path.basename(output_flf))
+            if(cache_dir is not None and path.exists(zip_flf) and path.getmtime(zip_flf) >= path.getmtime(output_flf)):
+                continue # compressed after the font was built
+            compress_flf(output_flf, zip_flf, args.zip_level)
+        built += [path.join(args.zip_dir, path.basename(output_flf)) for output_flf in built]
+    print(f"Done in {time.perf_counter() - start:.2f}s")
+    if(args.profile is not None): _finish_profiling(args.profile)
+    if(args.report):
+        for report in map(font_report, built):
+            print(f"{report['file']}: {report['size']} Bytes{' (ZIP)' if report['compressed'] else ''}, "
+                  f"loaded in {report['load_seconds']:.3f}s by {report['loader']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,508 @@
+"""
+Render text with the FIGfont styles straight from unifont glyphs, without reading a `.flf` file.
+
+The output is the same as pyfiglet (with the default layout) renders the font generated by
+`generate.py`, but only the glyphs in the text are rendered, and they're cached.
+`FlfFont`, `MappedFlfFont` and `ShardedFont` render with the generated `.flf` files in the same way.
+
+The source code is licensed under GPL2.0. See LICENSE.txt.
+"""
+import contextlib
+import json
+import mmap
+import re
+import sys
+import zipfile
+from os import path
+from abc import ABC, abstractmethod
+from bisect import bisect_right
+from collections import OrderedDict, deque
+
+import generate
+from generate import GlyphStore, Generator_figfont
+
+
+class TextRenderer(ABC):
+    """
+    The layout of FIGlet text, the same as pyfiglet with the default layout (full width).\n\n\
+    Subclasses give `height`, `hard_blank` and `glyphs()`.
+    """
+    height:int = 0
+    hard_blank:str = "$"
+
+    @abstractmethod
+    def glyphs(self, codes) -> dict:
+        """
+        :param codes: Iterable of unicode.
+        :return: `{unicode: [lines]}`. The lines are `None` if the character isn't in the font.
+        :rtype: dict
+        """
+
+    def render_text(self, text:str, width:float=80, justify:str="auto") -> str:
+        """
+        Render `text`, wrapping it in `width` columns, just like `pyfiglet.Figlet(...).renderText(text)`.
+
+        :param text: The text to render.
+        :type text: str
+        :param width: The max width of the output. `float("inf")` for no wrapping.
+        :type width: float
+        :param justify: `"auto"`/`"left"`, `"center"` or `"right"`.
+        :type justify: str
+        :rtype: str
+        """
+        return self.layout(text).render(width, justify)
+
+    def layout(self, text:str) -> "TextLayout":
+        """
+        Render `text` once, to be wrapped in any width by `TextLayout.render()`.
+
+        :param text: The text to render.
+        :type text: str
+        :rtype: TextLayout
+        """
+        return TextLayout(text, self.glyphs(map(ord, text)), self.height, self.hard_blank)
+
+    def render_many(self, texts, width:float=80, justify:str="auto", chunk_size:int=1024, executor=None):
+        """
+        Render many texts, like `render_text()` for each of them, and yield the results in order.\n\n\
+        The texts are read `chunk_size` at a time. The glyphs of the distinct characters of a chunk\
+        are looked up (rendered) together, and only once for all the texts.
+
+        :param texts: Iterable of str, e.g. the lines of a file.
+        :param width: See `render_text()`.
+        :param justify: See `render_text()`.
+        :param chunk_size: How many texts are read at a time.
+        :type chunk_size: int
+        :param executor: Optional. A `concurrent.futures` executor (e.g. `ProcessPoolExecutor`) to lay out\
+            the chunks in parallel. The glyphs are still looked up in this process. Only worth it for long\
+            texts, the chunks and the results are pickled.
+        :return: A generator of the rendered texts.
+        """
+        glyph_dic, widths = {}, {}
+        pending = deque() # the futures of the chunks, in order
+        for chunk in _chunks(texts, chunk_size):
+            chars = set()
+            for text in chunk: chars.update(text)
+            codes = set(map(ord, chars))
+            new_codes = codes.difference(glyph_dic)
+            if(new_codes): glyph_dic.update(self.glyphs(new_codes))
+            if(executor is None):
+                for text in chunk: yield layout_text(text, glyph_dic, self.height, self.hard_blank, width, justify, widths)
+                continue
+            chunk_glyphs = {code: glyph_dic[code] for code in codes}
+            pending.append(executor.submit(_layout_chunk, chunk, chunk_glyphs, self.height, self.hard_blank, width, justify))
+            while len(pending) > MAX_PENDING_CHUNKS: yield from pending.popleft().result()
+        while pending: yield from pending.popleft().result()
+
+
+MAX_PENDING_CHUNKS = 16 # How many chunks `render_many()` submits to the executor ahead
+
+def _chunks(iterable, size:int):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if(len(chunk) >= size):
+            yield chunk
+            chunk = []
+    if(chunk): yield chunk
+
+def _layout_chunk(texts:list, glyph_dic:dict, height:int, hard_blank:str, width:float, justify:str) -> list:
+    widths = {}
+    return [layout_text(text, glyph_dic, height, hard_blank, width, justify, widths) for text in texts]
+
+
+def layout_text(text:str, glyph_dic:dict, height:int, hard_blank:str="$", width:float=80, justify:str="auto",
+                widths:dict=None) -> str:
+    """
+    The layout of FIGlet text, the same as pyfiglet with the default layout (full width).
+
+    :param text: The text to render.
+    :param glyph_dic: `{unicode: [lines]}` of the characters in `text`, the lines are `None` if the\
+        character isn't in the font. See `TextRenderer.glyphs()`.
+    :param height: The height of the font.
+    :param hard_blank: The hardblank of the font, replaced with a space.
+    :param width: See `TextRenderer.render_text()`.
+    :param justify: See `TextRenderer.render_text()`.
+    :param widths: Optional. See `TextLayout`.
+    :rtype: str
+    """
+    return TextLayout(text, glyph_dic, height, hard_blank, widths).render(width, justify)
+
+
+class TextLayout:
+    """
+    Text rendered once: the glyph blocks of the text with their widths.\n\n\
+    `render()` wraps the blocks to any width (or no wrapping) without rendering the glyphs again,\
+    e.g. for the terminal width and for the clipboard, or again after the terminal is resized.
+
+    :param text: The text to render.
+    :param glyph_dic: `{unicode: [lines]}` of the characters in `text`, see `layout_text()`.
+    :param height: The height of the font.
+    :param hard_blank: The hardblank of the font, replaced with a space.
+    :param widths: Optional. `{unicode: (width, width of the first row)}` of the glyphs, filled in when needed.\
+        Pass the same dict to lay out many texts with the same `glyph_dic`.
+    """
+    __slots__ = ("height", "hard_blank", "codes", "blocks", "widths", "advances")
+
+    def __init__(self, text:str, glyph_dic:dict, height:int, hard_blank:str="$", widths:dict=None):
+        if(widths is None): widths = {}
+        self.height = height
+        self.hard_blank = hard_blank
+        self.codes, self.blocks = [], [] # the characters in the font and "\n", and their lines (`None` for "\n")
+        self.widths, self.advances = [], [] # the max width of the lines, and the width of the first line
+        for ch in text:
+            code = ord(ch)
+            if(code == 0x000A): # "\n"
+                lines, ch_widths = None, (0, 0)
+            else:
+                lines = glyph_dic[code]
+                if(lines is None): continue # not in the font, ignored
+                ch_widths = widths.get(code)
+                if(ch_widths is None): ch_widths = widths[code] = (max(map(len, lines), default=0), len(lines[0]) if lines else 0)
+            self.codes.append(code)
+            self.blocks.append(lines)
+            self.widths.append(ch_widths[0])
+            self.advances.append(ch_widths[1])
+
+    def lines(self, width:float=80) -> list:
+        """
+        Wrap the blocks in `width` columns, the same as pyfiglet.
+
+        :return: The lines of the output, a line is a list of blocks.
+        :rtype: list
+        """
+        codes, blocks, widths, advances = self.codes, self.blocks, self.widths, self.advances
+        product = [] # list of lines, a line is a list of glyphs
+        glyphs, glyphs_width = [], 0 # the current line, and the length of its first row
+        blank_markers = [] # (number of glyphs, index), where the line can be cut
+        k = 0
+        while k < len(codes):
+            code = codes[k]
+            if(code == 0x000A): # "\n"
+                product.append(glyphs)
+                glyphs, glyphs_width, blank_markers = [], 0, []
+                k += 1; continue
+            ch_width = widths[k]
+            if(width <= ch_width): # pyfiglet raises `CharNotPrinted` (or never ends if the widths are equal)
+                raise ValueError("Width is not enough to print this character")
+            if(code == 0x0020): blank_markers.append((len(glyphs), k))
+            if(glyphs_width + ch_width >= width):
+                if(blank_markers): # cut the line at the last blank
+                    n, k = blank_markers.pop()
+                    product.append(glyphs[:n])
+                    k += 1
+                else: # cut the line before this character
+                    product.append(glyphs)
+                glyphs, glyphs_width, blank_markers = [], 0, []
+                continue
+            glyphs.append(blocks[k])
+            glyphs_width += advances[k]
+            k += 1
+        if(glyphs_width > 0): product.append(glyphs)
+        return product
+
+    def render(self, width:float=80, justify:str="auto") -> str:
+        """
+        The text wrapped in `width` columns, the same as `TextRenderer.render_text()`.
+
+        :param width: The max width of the output. `float("inf")` for no wrapping.
+        :type width: float
+        :param justify: `"auto"`/`"left"`, `"center"` or `"right"`.
+        :type justify: str
+        :rtype: str
+        """
+        if(justify == "auto"): justify = "left"
+        ret_str = ""
+        for glyphs in self.lines(width):
+            buffer = ["".join([lines[row] for lines in glyphs]) for row in range(self.height)]
+            if(justify == "right"): buffer = [" " * (width - len(row) - 1) + row for row in buffer]
+            elif(justify == "center"): buffer = [" " * int((width - len(row)) / 2) + row for row in buffer]
+            ret_str += "\n".join(buffer) + "\n"
+        return ret_str.replace(self.hard_blank, " ")
+
+
+class Renderer(TextRenderer):
+    """
+    Render text in one FIGfont style.
+
+    :param style: A name in `generate.FONT_STYLES` (e.g. `"braille_dots"`),\
+        or a generator function of `Generator_figfont` (e.g. `"ch_box_drawing"`).
+    :type style: str
+    :param style_kwargs: The arguments of the generator function, if `style` is a function name.
+    :param flf_scope_arr: The characters can be rendered, see `generate.generate_bin_dic()`.\
+        Default `generate.get_flf_scope_arr()`, the same as the generated fonts.\
+        Use `[[0x0000, 0xFFFF]]` to render any glyph in unifont.
+    :type flf_scope_arr: list
+    :param font_source: Where to get the hex strings. Default `generate.dic`.
+    :type font_source: Mapping
+    :param cache_size: How many rendered glyphs are kept (least recently used are dropped).
+    :type cache_size: int
+    """
+    def __init__(self, style:str="braille_dots", flf_scope_arr:list=None, font_source=generate.dic,
+                 cache_size:int=4096, **style_kwargs):
+        if(style in generate.FONT_STYLES):
+            self.func_name, kwargs = generate.FONT_STYLES[style]
+            self.style_kwargs = {**kwargs, **style_kwargs}
+        elif(style.startswith("ch_") and hasattr(Generator_figfont, style)):
+            self.func_name, self.style_kwargs = style, style_kwargs
+        else:
+            raise ValueError(f"Unknown style `{style}`, expected in {list(generate.FONT_STYLES)} or a `ch_` function")
+        self.style = style
+        self.font_source = font_source
+        self.cache_size = cache_size
+        self.hits = self.misses = 0
+        self._cache = OrderedDict() # unicode => lines, or None if it can't be rendered
+        if(flf_scope_arr is None): flf_scope_arr = generate.get_flf_scope_arr()
+        self._set_scope(flf_scope_arr + [[0x0020, 0x007E], [0, 0]])
+        header_fig = self._render_fig([0x0020])
+        self.height = header_fig.height
+
+    def _set_scope(self, flf_scope_arr:list):
+        # merge the scopes to sorted, non-overlapping `[start, stop]`
+        merged = []
+        for start, stop in sorted(map(tuple, flf_scope_arr)):
+            if(merged and start <= merged[-1][1] + 1): merged[-1][1] = max(merged[-1][1], stop)
+            else: merged.append([start, stop])
+        self._scope_starts = [scope[0] for scope in merged]
+        self._scope_stops = [scope[1] for scope in merged]
+
+    def in_scope(self, code:int) -> bool:
+        k = bisect_right(self._scope_starts, code) - 1
+        return k >= 0 and code <= self._scope_stops[k]
+
+    def _render_fig(self, codes:list, vectorize:bool=False):
+        hex_items = []
+        for code in codes:
+            hex_items.append((code, generate.MISSING_CH_HEX if code == 0 else self.font_source[code]))
+        generator = Generator_figfont(GlyphStore.from_hex(hex_items), vectorize=vectorize)
+        return getattr(generator, self.func_name)(**self.style_kwargs)
+
+    def glyphs(self, codes) -> dict:
+        """
+        Render the glyphs of `codes`, only the ones not in the cache.
+
+        :param codes: Iterable of unicode.
+        :return: `{unicode: [lines]}`. The lines are `None` if the character isn't in the font.
+        :rtype: dict
+        """
+        ret_dic, missing = {}, {} # `missing` is an ordered set
+        for code in codes:
+            if(code in ret_dic): continue
+            if(code in self._cache):
+                self._cache.move_to_end(code)
+                ret_dic[code] = self._cache[code]
+                self.hits += 1
+            elif(code not in missing):
+                missing[code] = None
+                self.misses += 1
+        if(missing):
+            renderable = [code for code in missing if self.in_scope(code) and code in self.font_source or code == 0]
+            rendered = {}
+            if(renderable):
+                # NumPy is only worth importing for many glyphs
+                rendered = self._render_fig(renderable, vectorize=len(renderable) >= 512).font_dic
+            for code in missing:
+                if(generate.is_ne_ch(code) and not 0x0020 <= code <= 0x007E): # the required Deutsch characters are blank
+                    lines = None # pyfiglet ignores blank characters
+                else:
+                    lines = rendered.get(code)
+                ret_dic[code] = lines
+                self._cache[code] = lines
+            while len(self._cache) > self.cache_size: self._cache.popitem(last=False)
+        return ret_dic
+
+    def glyph(self, code:int) -> list:
+        """The lines of `code`, `None` if it isn't in the font."""
+        return self.glyphs([code])[code]
+
+_SPECIAL_LINE_BREAKS = re.compile("[\u0085\u2028\u2029]") # not line breaks of a FIGfont
+
+def _strip_end_marks(lines:list) -> list:
+    """The lines of a glyph without the end marks, which is the last character of the first line."""
+    end_mark = re.compile(re.escape(re.search("(.)\\s*$", lines[0]).group(1)) + "{1,2}\\s*$")
+    return [end_mark.sub("", line) for line in lines]
+
+
+class FlfFont(TextRenderer):
+    """
+    Render text with a `.flf` file (plain or ZIP-compressed), parsed like pyfiglet.
+
+    :param flf_file: The FIGfont file.
+    :type flf_file: str
+    """
+    def __init__(self, flf_file:str):
+        self.flf_file = flf_file
+        self.chars = {}
+        data = _SPECIAL_LINE_BREAKS.sub(" ", generate.read_flf(flf_file)).splitlines()
+        header = data[0].split()
+        if(not re.match("^[tf]lf2.", header[0])): raise ValueError(f"{flf_file} is not a FIGfont file")
+        self.hard_blank = header[0][-1]
+        self.height = int(header[1])
+        pos = 1 + int(header[5]) # skip the comment lines
+
+        def read_char() -> list:
+            nonlocal pos
+            lines = data[pos:pos+self.height]
+            pos += self.height
+            return _strip_end_marks(lines)
+
+        for code in range(0x0020, 0x007E+1):
+            lines = read_char()
+            if(code == 0x0020 or "".join(lines) != ""): self.chars[code] = lines
+        if(pos < len(data)):
+            for ch in "ÄÖÜäöüß":
+                lines = read_char()
+                if("".join(lines) != ""): self.chars[ord(ch)] = lines
+        while pos < len(data):
+            code_tag = data[pos].strip().split(" ", 1)[0]
+            pos += 1
+            if(code_tag == ""): continue
+            if(code_tag[:2].lower() == "0x"):
+                lines = read_char()
+                if("".join(lines) != ""): self.chars[int(code_tag, 16)] = lines
+
+    def glyphs(self, codes) -> dict:
+        return {code: self.chars.get(code) for code in codes}
+
+    def glyph(self, code:int) -> list:
+        return self.chars.get(code)
+
+
+class MappedFlfFont(TextRenderer):
+    """
+    Render text with a plain `.flf` file, memory-mapped: only the glyphs in the text are read and decoded.\n\n\
+    The glyphs are found by the codetag index `<font>.flf.idx` (see `generate.FlfIndex`), if it was written.\
+    If the index is missing or stale, the font is scanned once in memory, nothing is written unless `save_index`.\
+    The glyphs are the same as `FlfFont` reads.
+
+    :param flf_file: The plain FIGfont file. Use `FlfFont` for a ZIP-compressed one.
+    :type flf_file: str
+    :param index_file: Optional. The codetag index, default `flf_file + ".idx"`.
+    :type index_file: str
+    :param save_index: Optional. Save the index if it's scanned, see `generate.index_flf()`.
+    :type save_index: bool
+    """
+    def __init__(self, flf_file:str, index_file:str=None, save_index:bool=False):
+        self.flf_file = flf_file
+        with open(flf_file, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        end = self._mm.find(b"\n")
+        header = self._mm[0:end if end != -1 else len(self._mm)].decode("utf-8", "replace").split()
+        if(not header or not re.match("^[tf]lf2.", header[0])): raise ValueError(f"{flf_file} is not a FIGfont file")
+        self.hard_blank = header[0][-1]
+        self.height = int(header[1])
+        self.index = generate.FlfIndex.load(flf_file, index_file)
+        if(self.index is None):
+            self.index = generate.FlfIndex.scan(self._mm)
+            if(save_index): self.index.save(flf_file, index_file)
+        self.chars = {} # the decoded glyphs, `None` if not in the font
+
+    def glyph(self, code:int) -> list:
+        if(code in self.chars): return self.chars[code]
+        found = self.index.find(code)
+        lines = None
+        if(found is not None):
+            offset, length = found
+            lines = _strip_end_marks(_SPECIAL_LINE_BREAKS.sub(" ", self._mm[offset:offset+length].decode("utf-8"))
+                                     .splitlines())
+            if(code != 0x0020 and "".join(lines) == ""): lines = None
+        self.chars[code] = lines
+        return lines
+
+    def glyphs(self, codes) -> dict:
+        return {code: self.glyph(code) for code in codes}
+
+    def close(self):
+        self._mm.close()
+
+
+def open_font(font_file:str) -> TextRenderer:
+    """
+    The renderer of a generated font: `ShardedFont` for a manifest (`*.shards.json`),\
+    `FlfFont` for a ZIP-compressed `.flf` file, or `MappedFlfFont` for a plain one.
+    """
+    if(font_file.endswith(".json")): return ShardedFont(font_file)
+    if(zipfile.is_zipfile(font_file)): return FlfFont(font_file)
+    return MappedFlfFont(font_file)
+
+
+class ShardedFont(TextRenderer):
+    """
+    Render text with the sharded fonts written by `generate.build_shards()`.\n\n\
+    Only the hot shard is read at first. A cold shard is read when a character in its range is rendered.
+
+    :param manifest_file: The `*.shards.json` file.
+    :type manifest_file: str
+    """
+    def __init__(self, manifest_file:str):
+        with open(manifest_file, "r", encoding="utf-8") as f: manifest = json.load(f)
+        self.shard_dir = path.dirname(path.abspath(manifest_file))
+        self.shard_files = [shard["file"] for shard in manifest["shards"]]
+        self.shards = [None] * len(self.shard_files) # see `open_font()`, opened when needed
+        ranges = sorted((start, stop, k) for k, shard in enumerate(manifest["shards"]) if k > 0
+                        for start, stop in shard["ranges"])
+        self._range_starts = [r[0] for r in ranges]
+        self._ranges = ranges
+        hot = self._shard(0)
+        self.height, self.hard_blank = hot.height, hot.hard_blank
+
+    def _shard(self, k:int) -> TextRenderer:
+        if(self.shards[k] is None): self.shards[k] = open_font(path.join(self.shard_dir, self.shard_files[k]))
+        return self.shards[k]
+
+    def glyphs(self, codes) -> dict:
+        hot = self._shard(0)
+        ret_dic = {}
+        for code in codes:
+            lines = hot.glyph(code)
+            if(lines is None):
+                k = bisect_right(self._range_starts, code) - 1
+                if(k >= 0 and code <= self._ranges[k][1]):
+                    lines = self._shard(self._ranges[k][2]).glyph(code)
+            ret_dic[code] = lines
+        return ret_dic
+
+    def loaded_files(self) -> list:
+        """The shard files have been opened."""
+        return [file for file, shard in zip(self.shard_files, self.shards) if shard is not None]
+
+
+def main(argv:list=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Render text from unifont glyphs in a FIGfont style.")
+    parser.add_argument("text", nargs="*", help="Text to render, read from stdin if not given")
+    parser.add_argument("-s", "--style", default="braille_dots",
+                        help=f"Default: %(default)s. Choices: {', '.join(generate.FONT_STYLES)}")
+    parser.add_argument("-f", "--font", default=None,
+                        help="Render with a generated font instead: a .flf file or a sharded font manifest (*.shards.json)")
+    parser.add_argument("-w", "--width", type=int, default=None, help="Default: the terminal width, 0 for no wrapping")
+    parser.add_argument("-l", "--lines", action="store_true",
+                        help="Render every line of stdin separately, in one pass (see `TextRenderer.render_many()`)")
+    parser.add_argument("-o", "--output", default=None, help="Write to this file instead of stdout")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="Lines mode: lay out the texts in this many processes")
+    args = parser.parse_args(argv)
+    width = args.width
+    if(width is None):
+        import shutil
+        width = shutil.get_terminal_size().columns
+    renderer = Renderer(args.style) if args.font is None else open_font(args.font)
+    # only close the file opened here, not stdout
+    output_context = contextlib.nullcontext(sys.stdout) if args.output is None else open(args.output, "w", encoding="utf-8")
+    with output_context as output:
+        if(args.lines):
+            texts = (line.rstrip("\n") for line in sys.stdin)
+            executor = None
+            if(args.jobs is not None and args.jobs > 1):
+                from concurrent.futures import ProcessPoolExecutor
+                executor = ProcessPoolExecutor(args.jobs)
+            try:
+                output.writelines(renderer.render_many(texts, width=width or float("inf"), executor=executor))
+            finally:
+                if(executor is not None): executor.shutdown()
+            return
+        text = " ".join(args.text) if args.text else sys.stdin.read().rstrip("\n")
+        output.write(renderer.render_text(text, width=width or float("inf")))
+
+
+if __name__ == "__main__":
+    main()
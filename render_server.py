@@ -0,0 +1,293 @@
+"""
+A local render server: keep the fonts loaded and render text for many short-lived clients.
+
+The server listens on a Unix socket (or `host:port` for localhost TCP). The protocol is JSON lines:
+every line is a request, or a list of requests (a batch), and every request gets a response line in order.
+A client can send many lines without waiting (pipelining).
+
+    {"id": 1, "text": "你好", "style": "braille_dots", "width": 80, "justify": "auto"}
+    => {"id": 1, "ok": true, "text": "..."}
+    {"op": "metrics"}
+    => {"ok": true, "metrics": {"requests": ..., "requests_per_second": ..., "latency_ms": {...}, "cache_hit_rate": ...}}
+
+    python render_server.py serve -s braille_dots block_bold_split
+    python render_server.py render -s braille_dots 你好
+    python render_server.py metrics
+
+The source code is licensed under GPL2.0. See LICENSE.txt.
+"""
+import asyncio
+import json
+import os
+import signal
+import socket
+import sys
+import time
+from os import path
+from collections import OrderedDict, deque
+
+import generate
+from render import TextRenderer, Renderer, open_font
+
+DEFAULT_ADDRESS = generate.CACHE_DIR + "render.sock" if hasattr(socket, "AF_UNIX") else "127.0.0.1:8765"
+MAX_LINE = 1 << 24 # The max length of a request line (a batch)
+
+
+def parse_address(address:str):
+    """`(host, port)` for `host:port`, or the path of a Unix socket."""
+    host, sep, port = address.rpartition(":")
+    if(sep and port.isdigit() and "/" not in address): return host or "127.0.0.1", int(port)
+    return address
+
+
+def load_font(style:str, font_dir:str=generate.OUTPUT_DIR) -> TextRenderer:
+    """
+    The generated font `<font_dir>/chinese_<style>.flf` if it exists,\
+    or render `style` from unifont glyphs (see `render.Renderer`).
+    """
+    flf_file = path.join(font_dir, generate.OUTPUT_PREFIX + style + ".flf")
+    if(path.exists(flf_file)): return open_font(flf_file)
+    if(style in generate.FONT_STYLES): return Renderer(style)
+    raise ValueError(f"Unknown style `{style}`, expected in {list(generate.FONT_STYLES)} or a font in {font_dir}")
+
+
+class Metrics:
+    """
+    The requests served, the latency of the recent requests and the hit rate of the result cache.
+
+    :param window: How many recent requests are kept for the latency percentiles and the recent rate.
+    :type window: int
+    """
+    def __init__(self, window:int=10000):
+        self.started = time.monotonic()
+        self.requests = self.errors = self.hits = self.misses = 0
+        self._latencies = deque(maxlen=window) # seconds
+        self._finished = deque(maxlen=window) # time.monotonic()
+
+    def record(self, seconds:float, hit:bool=None, error:bool=False):
+        self.requests += 1
+        if(error): self.errors += 1
+        elif(hit): self.hits += 1
+        elif(hit is not None): self.misses += 1
+        self._latencies.append(seconds)
+        self._finished.append(time.monotonic())
+
+    def snapshot(self) -> dict:
+        uptime = time.monotonic() - self.started
+        latencies = sorted(self._latencies)
+        def percentile(p:float) -> float:
+            return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000 if latencies else 0.0
+        recent = len(self._finished) / (self._finished[-1] - self._finished[0]) if len(self._finished) > 1 and \
+            self._finished[-1] > self._finished[0] else 0.0
+        return {
+            "uptime_seconds": uptime,
+            "requests": self.requests,
+            "errors": self.errors,
+            "requests_per_second": self.requests / uptime if uptime > 0 else 0.0,
+            "recent_requests_per_second": recent,
+            "latency_ms": {"p50": percentile(0.5), "p90": percentile(0.9), "p99": percentile(0.99),
+                           "max": latencies[-1] * 1000 if latencies else 0.0},
+            "cache_hit_rate": self.hits / (self.hits + self.misses) if self.hits + self.misses else 0.0,
+        }
+
+
+class RenderServer:
+    """
+    Render text for the clients with the preloaded fonts, and cache the results.
+
+    :param styles: The styles to load, e.g. `["braille_dots"]`. The first one is the default.
+    :type styles: list
+    :param font_dir: Where the generated fonts are, see `load_font()`.
+    :type font_dir: str
+    :param cache_size: How many rendered results are kept (least recently used are dropped).
+    :type cache_size: int
+    """
+    def __init__(self, styles:list, font_dir:str=generate.OUTPUT_DIR, cache_size:int=4096):
+        if(not styles): raise ValueError("At least one style is needed")
+        self.fonts = {style: load_font(style, font_dir) for style in styles}
+        self.default_style = styles[0]
+        self.cache_size = cache_size
+        self.metrics = Metrics()
+        self._cache = OrderedDict() # (style, text, width, justify) => rendered text
+
+    def render(self, request:dict) -> dict:
+        """The response of a request, see the module docstring."""
+        start = time.perf_counter()
+        response = {"id": request.get("id")} if isinstance(request, dict) else {"id": None}
+        hit = None
+        try:
+            if(not isinstance(request, dict)): raise ValueError("A request must be an object")
+            op = request.get("op", "render")
+            if(op == "metrics"):
+                response.update(ok=True, metrics=self.metrics.snapshot())
+            elif(op == "styles"):
+                response.update(ok=True, styles=list(self.fonts), default=self.default_style)
+            elif(op == "render"):
+                style = request.get("style") or self.default_style
+                if(style not in self.fonts): raise ValueError(f"Style `{style}` is not loaded, loaded: {list(self.fonts)}")
+                text = request["text"]
+                width = request.get("width", 80)
+                width = float("inf") if width is None or width == 0 else width
+                key = (style, text, width, request.get("justify", "auto"))
+                hit = key in self._cache
+                if(hit):
+                    self._cache.move_to_end(key)
+                else:
+                    self._cache[key] = self.fonts[style].render_text(text, width=width, justify=key[3])
+                    while len(self._cache) > self.cache_size: self._cache.popitem(last=False)
+                response.update(ok=True, text=self._cache[key])
+            else:
+                raise ValueError(f"Unknown op `{op}`")
+        except (KeyError, TypeError, ValueError) as e:
+            response.update(ok=False, error=f"{type(e).__name__}: {e}")
+            self.metrics.record(time.perf_counter() - start, error=True)
+            return response
+        self.metrics.record(time.perf_counter() - start, hit)
+        return response
+
+    async def handle(self, reader:asyncio.StreamReader, writer:asyncio.StreamWriter):
+        try:
+            while True:
+                line = await reader.readline()
+                if(not line): break
+                try:
+                    requests = json.loads(line)
+                except ValueError as e:
+                    writer.write(json.dumps({"id": None, "ok": False, "error": f"Invalid JSON: {e}"}).encode("utf-8") + b"\n")
+                    await writer.drain()
+                    continue
+                for request in (requests if isinstance(requests, list) else [requests]):
+                    writer.write(json.dumps(self.render(request), ensure_ascii=False).encode("utf-8") + b"\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, address:str=DEFAULT_ADDRESS):
+        """Serve until cancelled (or SIGTERM)."""
+        address = parse_address(address)
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+        except (AttributeError, NotImplementedError, RuntimeError): # no SIGTERM handler on Windows, or not in the main thread
+            pass
+        if(isinstance(address, tuple)):
+            server = await asyncio.start_server(self.handle, address[0], address[1], limit=MAX_LINE)
+        else:
+            os.makedirs(path.dirname(path.abspath(address)), exist_ok=True)
+            server = await asyncio.start_unix_server(self.handle, address, limit=MAX_LINE)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            if(not isinstance(address, tuple) and path.exists(address)): os.remove(address)
+
+
+class RenderClient:
+    """
+    A blocking client of `RenderServer`.
+
+    :param address: The Unix socket, or `host:port`.
+    :type address: str
+    :param timeout: Optional. The socket timeout in seconds.
+    :type timeout: float
+    """
+    def __init__(self, address:str=DEFAULT_ADDRESS, timeout:float=None):
+        address = parse_address(address)
+        if(isinstance(address, tuple)):
+            self._sock = socket.create_connection(address, timeout)
+            self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        else:
+            self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._sock.settimeout(timeout)
+            self._sock.connect(address)
+        self._file = self._sock.makefile("rwb")
+
+    def request(self, requests:list) -> list:
+        """Send `requests` as a batch, return the responses in order."""
+        self._file.write(json.dumps(requests, ensure_ascii=False).encode("utf-8") + b"\n")
+        self._file.flush()
+        return [json.loads(self._file.readline()) for _ in requests]
+
+    def iter_render(self, requests, batch_size:int=256):
+        """
+        Render many requests, `batch_size` requests a line, and yield the texts in order.
+
+        :param requests: Iterable of request dicts (see the module docstring) or strings.
+        :raise ValueError: If the server can't render a request.
+        """
+        batch = []
+        def flush():
+            for response in self.request(batch):
+                if(not response["ok"]): raise ValueError(response["error"])
+                yield response["text"]
+            batch.clear()
+        for request in requests:
+            batch.append({"text": request} if isinstance(request, str) else request)
+            if(len(batch) >= batch_size): yield from flush()
+        if(batch): yield from flush()
+
+    def render(self, text:str, style:str=None, width:float=80, justify:str="auto") -> str:
+        """Like `render.TextRenderer.render_text()`. `width` is `None` for no wrapping."""
+        request = {"text": text, "style": style, "width": None if width == float("inf") else width, "justify": justify}
+        return next(self.iter_render([request]))
+
+    def metrics(self) -> dict:
+        return self.request([{"op": "metrics"}])[0]["metrics"]
+
+    def styles(self) -> list:
+        return self.request([{"op": "styles"}])[0]["styles"]
+
+    def close(self):
+        self._file.close()
+        self._sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main(argv:list=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="A local server to render text with preloaded FIGfonts.")
+    parser.add_argument("-a", "--address", default=DEFAULT_ADDRESS, help="Unix socket or host:port. Default: %(default)s")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve = commands.add_parser("serve", help="Run the server")
+    serve.add_argument("-s", "--styles", nargs="+", default=["braille_dots"],
+                       help=f"Styles to load, the first is the default. Choices: {', '.join(generate.FONT_STYLES)}")
+    serve.add_argument("-f", "--font-dir", default=generate.OUTPUT_DIR,
+                       help="The generated fonts. A style without a font here is rendered from unifont. Default: %(default)s")
+    serve.add_argument("--cache-size", type=int, default=4096, help="Rendered results to keep. Default: %(default)s")
+    render = commands.add_parser("render", help="Render text with the server")
+    render.add_argument("text", nargs="*", help="Text to render. If not given, every line of stdin is rendered")
+    render.add_argument("-s", "--style", default=None, help="Default: the default style of the server")
+    render.add_argument("-w", "--width", type=int, default=None, help="Default: the terminal width, 0 for no wrapping")
+    commands.add_parser("metrics", help="Print the metrics of the server")
+    args = parser.parse_args(argv)
+
+    if(args.command == "serve"):
+        server = RenderServer(args.styles, args.font_dir, args.cache_size)
+        print(f"Serving {', '.join(server.fonts)} on {args.address}", file=sys.stderr)
+        try:
+            asyncio.run(server.serve(args.address))
+        except (KeyboardInterrupt, asyncio.CancelledError):
+            pass
+        return
+    with RenderClient(args.address) as client:
+        if(args.command == "metrics"):
+            print(json.dumps(client.metrics(), indent=2))
+            return
+        width = args.width
+        if(width is None):
+            import shutil
+            width = shutil.get_terminal_size().columns
+        texts = [" ".join(args.text)] if args.text else (line.rstrip("\n") for line in sys.stdin)
+        requests = ({"text": text, "style": args.style, "width": width or None} for text in texts)
+        for rendered in client.iter_render(requests):
+            sys.stdout.write(rendered)
+
+
+if __name__ == "__main__":
+    main()
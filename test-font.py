@@ -1,12 +1,11 @@
-import pyfiglet
 from pyperclip import copy
 from os import get_terminal_size
-font = pyfiglet.Figlet(font="chinese_braille_dots", width=get_terminal_size().columns)
+from render import Renderer
+font = Renderer("braille_dots") # The same as `pyfiglet.Figlet(font="chinese_braille_dots")`, but don't need the .flf file
 
-print(font.renderText("ok"))
+print(font.render_text("ok", width=get_terminal_size().columns))
 while True:
     text = input("> ")
-    font.width = float("inf")
-    copy(font.renderText(text))
-    font.width = get_terminal_size().columns
-    print(font.renderText(text))
\ No newline at end of file
+    layout = font.layout(text) # rendered once, wrapped twice
+    copy(layout.render(width=float("inf")))
+    print(layout.render(width=get_terminal_size().columns))
@@ -0,0 +1,4 @@
+import sys
+from os import path
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__)))) # import generate.py etc. from the repository root
@@ -0,0 +1,22 @@
+"""
+A stage of the benchmark regresses only if it grows more than the threshold and the absolute floor.
+"""
+import bench
+
+
+def result(seconds:float, peak_bytes:int) -> dict:
+    return {"seconds": seconds, "peak_bytes": peak_bytes, "output_bytes": 0}
+
+
+def test_compare_thresholds():
+    baseline = {"slow": result(1.0, 1 << 20), "fast": result(0.0005, 1024), "free": result(0.0, 0)}
+    assert bench.compare({"slow": result(1.1, 1 << 20)}, baseline) == [] # within 20%
+    assert bench.compare({"slow": result(1.3, 2 << 20)}, baseline) == [
+        ("slow", "seconds", 1.0, 1.3), ("slow", "peak_bytes", 1 << 20, 2 << 20)]
+    assert bench.compare({"slow": result(1.3, 1 << 20)}, baseline, threshold=0.5) == []
+    # 4 times slower, but by less than the timer noise
+    assert bench.compare({"fast": result(0.002, 4096)}, baseline) == []
+    assert bench.compare({"fast": result(0.002, 4096)}, baseline, min_delta={"seconds": 0.001, "peak_bytes": 1024}) == [
+        ("fast", "seconds", 0.0005, 0.002), ("fast", "peak_bytes", 1024, 4096)]
+    # no baseline value to compare with
+    assert bench.compare({"free": result(1.0, 1 << 30), "new": result(1.0, 0)}, baseline) == []
@@ -0,0 +1,209 @@
+"""
+The output of every generation path is the same: the lookup tables, NumPy, several styles in one pass,
+rendered lazily and from the build cache. And the font files, the glyph store, the scopes and the command line.
+"""
+import json
+from pathlib import Path
+
+import pytest
+
+import generate
+import render
+from generate import FONT_STYLES, Generator_figfont
+
+STYLES = list(FONT_STYLES.values())
+
+
+@pytest.fixture(scope="module")
+def bin_dic():
+    return generate.generate_bin_dic(generate.get_flf_scope_arr()[:300])
+
+
+@pytest.fixture(scope="module")
+def expected(bin_dic):
+    """The font_dic of every style, rendered by the lookup tables one style at a time."""
+    return {name: getattr(Generator_figfont(bin_dic, vectorize=False), func_name)(**kwargs).font_dic
+            for name, (func_name, kwargs) in FONT_STYLES.items()}
+
+
+def test_numpy_matches_lookup_tables(bin_dic, expected):
+    pytest.importorskip("numpy")
+    for name, (func_name, kwargs) in FONT_STYLES.items():
+        assert getattr(Generator_figfont(bin_dic), func_name)(**kwargs).font_dic == expected[name], name
+
+
+@pytest.mark.parametrize("vectorize", [False, True])
+def test_generate_styles_matches_single_styles(bin_dic, expected, vectorize):
+    if(vectorize): pytest.importorskip("numpy")
+    fig_fonts = Generator_figfont(bin_dic, vectorize).generate_styles(STYLES)
+    for name, fig_font in zip(FONT_STYLES, fig_fonts):
+        assert fig_font.font_dic == expected[name], name
+
+
+def test_lazy_matches(bin_dic, expected):
+    fig_fonts = Generator_figfont(bin_dic).lazy_styles(STYLES, chunk_size=64)
+    for name, fig_font in zip(FONT_STYLES, fig_fonts):
+        assert dict(fig_font.font_dic.items()) == expected[name], name
+
+
+def test_build_cache_matches(bin_dic, tmp_path):
+    names = ["braille_dots", "block_bold_split", "ascii_small"]
+    fresh_dir, cached_dir, cache_dir = tmp_path / "fresh", tmp_path / "cached", tmp_path / "cache"
+    list(generate.build_fonts(bin_dic, names, str(fresh_dir), jobs=1))
+    list(generate.build_fonts(bin_dic, names, str(cached_dir), jobs=1, cache_dir=str(cache_dir)))
+    for flf in cached_dir.glob("*.flf"): flf.unlink() # render again, every glyph from the cache
+    results = list(generate.build_fonts(bin_dic, names, str(cached_dir), jobs=1, cache_dir=str(cache_dir)))
+    assert all(status.startswith("0 of") for name, output_flf, seconds, status in results)
+    for name in names:
+        flf = generate.OUTPUT_PREFIX + name + ".flf"
+        assert (cached_dir / flf).read_bytes() == (fresh_dir / flf).read_bytes(), name
+
+
+def test_trim_keeps_the_shapes(bin_dic):
+    fig_font = Generator_figfont(bin_dic).ch_braille_dots()
+    trimmed = Generator_figfont(bin_dic).trim(Generator_figfont(bin_dic).ch_braille_dots())
+    for code, lines in trimmed.font_dic.items():
+        full = fig_font.font_dic[code]
+        assert len(lines) == len(full) and max(map(len, lines)) <= max(map(len, full)) + 1, hex(code)
+        if(any(line.strip(generate.BLANK_CHARS) for line in full)): # a blank glyph keeps its width, see `trim_glyph()`
+            assert [line.replace("$", " ").strip() for line in lines] == [line.strip(generate.BLANK_CHARS) for line in full], hex(code)
+
+
+def test_failed_write_leaves_no_temporary_file(bin_dic, tmp_path):
+    fig_font = Generator_figfont(bin_dic).ch_braille_dots()
+    fig_font.font_dic = {i: lines for i, lines in fig_font.font_dic.items() if i != ord("A")} # a required glyph is missing
+    with pytest.raises(KeyError):
+        generate.generate_flf(str(tmp_path / "broken.flf"), fig_font)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_lazy_fonts_render_every_glyph_once(bin_dic, tmp_path, monkeypatch):
+    rendered = []
+    draw = Generator_figfont._draw
+    def counting_draw(self, ret_fig, *args, **kwargs):
+        rendered.append(len(self.bin_dic))
+        return draw(self, ret_fig, *args, **kwargs)
+    monkeypatch.setattr(Generator_figfont, "_draw", counting_draw)
+    styles = [FONT_STYLES["braille_dots"], FONT_STYLES["block_bold_split"]]
+    fig_fonts = Generator_figfont(bin_dic).lazy_styles(styles, chunk_size=64)
+    generate.generate_flfs([(str(tmp_path / f"{k}.flf"), fig_font) for k, fig_font in enumerate(fig_fonts)])
+    assert sum(rendered) == len(styles) * (len(bin_dic) + 1) # and one glyph for the headers
+
+
+def test_wide_glyphs_fit_the_header(tmp_path):
+    # 16, 24 and 32 pixels wide glyphs in one shard, with the necessary characters of unifont
+    font_source = {i: generate.dic[i] for i in range(0x20, 0x7F)}
+    font_source.update({0xE000: "F0A5" * 16, 0xE001: "F0A5C3" * 16, 0xE002: "F0A5C3E7" * 16})
+    manifest_files = generate.build_range_shards([[0xE000, 0xE002]], font_source=font_source, output_dir=str(tmp_path), jobs=1)
+    for name, manifest_file in manifest_files.items():
+        manifest = json.loads(Path(manifest_file).read_text(encoding="utf-8"))
+        for shard in manifest["shards"]:
+            header, *lines = (tmp_path / shard["file"]).read_text(encoding="utf-8").splitlines()
+            attributes = header.split()
+            max_length, comment_lines = int(attributes[3]), int(attributes[5])
+            lines = lines[comment_lines:]
+            assert max(map(len, lines)) <= max_length, shard["file"]
+        assert max(map(len, lines)) == max_length, name # the widest glyph (in the last shard) fills the line
+
+
+def test_fonts_are_written_with_the_newline(bin_dic, tmp_path, monkeypatch):
+    fig_font = Generator_figfont(bin_dic).ch_braille_dots()
+    generate.generate_flf(str(tmp_path / "lf.flf"), fig_font)
+    monkeypatch.setattr(generate, "FLF_NEWLINE", "\r\n")
+    generate.generate_flf(str(tmp_path / "crlf.flf"), fig_font, write_index=True)
+    crlf = (tmp_path / "crlf.flf").read_bytes()
+    assert crlf == (tmp_path / "lf.flf").read_bytes().replace(b"\n", b"\r\n")
+    index, scanned = generate.FlfIndex.load(str(tmp_path / "crlf.flf")), generate.FlfIndex.scan(crlf)
+    assert (index.codes, index.offsets, index.lengths) == (scanned.codes, scanned.offsets, scanned.lengths)
+
+
+def test_compressed_fonts(bin_dic, tmp_path):
+    fig_font = Generator_figfont(bin_dic).ch_braille_dots()
+    generate.generate_flf(str(tmp_path / "plain.flf"), fig_font)
+    generate.generate_flf(str(tmp_path / "written.flf"), fig_font, compresslevel=9)
+    generate.compress_flf(str(tmp_path / "plain.flf"), str(tmp_path / "copied.flf"))
+    for name in ["written.flf", "copied.flf"]:
+        assert generate.read_flf(str(tmp_path / name)) == generate.read_flf(str(tmp_path / "plain.flf")), name
+        assert (tmp_path / name).read_bytes()[28:30] == b"\0\0", name # no extra field (ZIP64 records) in the local header
+    with pytest.raises(FileNotFoundError):
+        generate.compress_flf(str(tmp_path / "missing.flf"), str(tmp_path / "missing.zip.flf"))
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["copied.flf", "plain.flf", "written.flf"]
+
+
+def test_glyph_store_file(tmp_path):
+    hex_dic = {0x0041: "0000000018242442427E424242420000", 0x4E00: "00000000000000007FFE" + "0" * 44,
+               0x1F600: "F0A5C3" * 16, 0x20000: "F0A5C3E7" * 16} # 8, 16, 24 and 32 pixels wide
+    hex_file, store_file = tmp_path / "font.hex", tmp_path / "font.glyphs"
+    hex_file.write_text("".join(f"{code:04X}:{hex_str}\n" for code, hex_str in hex_dic.items()), encoding="ascii")
+    generate.generate_glyph_store(str(store_file), str(hex_file), "1.2.3")
+    store = generate.GlyphStoreFile(str(store_file), "1.2.3")
+    assert dict(store) == hex_dic and list(store) == sorted(hex_dic)
+    assert [store.width(code) for code in sorted(hex_dic)] == [8, 16, 24, 32]
+    assert 0x0042 not in store and not store.is_stale(str(hex_file))
+    with pytest.raises(KeyError):
+        store[0x0042]
+    store.close()
+    hex_file.write_text(f"0041:{hex_dic[0x0041]}\n", encoding="ascii")
+    assert generate.GlyphStoreFile(str(store_file), "1.2.3").is_stale(str(hex_file))
+    with pytest.raises(ValueError, match="unifont 1.2.3"):
+        generate.GlyphStoreFile(str(store_file), "4.5.6")
+    data = bytearray(store_file.read_bytes())
+    data[4:6] = (generate.GlyphStoreFile.FORMAT_VERSION + 1).to_bytes(2, "little")
+    store_file.write_bytes(data)
+    with pytest.raises(ValueError, match="format version"):
+        generate.GlyphStoreFile(str(store_file), "1.2.3")
+
+
+def test_corpus_scope(tmp_path):
+    corpus = tmp_path / "corpus.txt"
+    corpus.write_text("你好，世界\n你好 Hello\n", encoding="utf-8")
+    font_source = {ord(ch): generate.MISSING_CH_HEX for ch in "你好世界"}
+    with open(corpus, encoding="utf-8") as f:
+        assert generate.read_corpus_scope([f]) == [[ord(ch), ord(ch)] for ch in sorted("你好世界，")]
+    assert generate.read_corpus_scope(["你好，世界", "你好"], min_count=2) == [[ord("你"), ord("你")], [ord("好"), ord("好")]]
+    scope = generate.read_corpus_scope(["你好，世界\tÄ"], font_source=font_source) # "，" isn't in the font
+    assert scope == [[ord(ch), ord(ch)] for ch in sorted("你好世界")]
+    bin_dic = generate.generate_bin_dic(scope, generate.dic)
+    assert sorted(bin_dic) == sorted([0, *range(0x20, 0x7F), *map(ord, "你好世界")])
+
+
+def test_hot_codes_skip_the_necessary_characters():
+    texts = ["好好好 a a a\n", "你你 好\n\n", "世"]
+    assert generate.read_hot_codes(texts) == [ord("好"), ord("你"), ord("世")]
+    assert generate.read_hot_codes(texts, hot_size=2) == [ord("好"), ord("你")]
+
+
+def test_profile_dumps_of_the_styles(bin_dic, tmp_path):
+    import pstats
+    profiler = generate.Profiler(str(tmp_path / "prof"), slowest=1, trace_memory=False)
+    try:
+        generate._profiler = profiler
+        fig_font = Generator_figfont(bin_dic).lazy("ch_braille_dots", chunk_size=128)
+        generate.generate_flf(str(tmp_path / "font.flf"), fig_font)
+    finally:
+        generate._profiler = None
+    profiler.write(str(tmp_path / "report.json"))
+    style_stats = pstats.Stats(str(tmp_path / "prof" / "braille_dots.prof"))
+    flf_stats = pstats.Stats(str(tmp_path / "prof" / "generate_flf_font.flf.prof"))
+    assert profiler.stages["braille_dots"]["glyphs"] == len(bin_dic) # not the header
+    assert len(profiler.stages["braille_dots"]["slowest_glyphs"]) == 1
+    def calls(stats:pstats.Stats, func_name:str) -> int:
+        return sum(stat[1] for (file, line, name), stat in stats.stats.items() if name == func_name)
+    assert calls(style_stats, "ch_braille_dots") == calls(flf_stats, "ch_braille_dots") > 0
+
+
+def test_cli_ranges_before_the_styles(tmp_path):
+    # like the README: the styles after `-r` aren't taken as ranges
+    generate.main(["-r", "4E00-4E0F,4E20", "-r", "4E30", "-o", str(tmp_path), "-j", "1", "braille_dots", "block_bold_split"])
+    manifests = sorted(p.name for p in tmp_path.glob("*.shards.json"))
+    assert manifests == [f"{generate.OUTPUT_PREFIX}{name}.shards.json" for name in ["block_bold_split", "braille_dots"]]
+    font = render.ShardedFont(str(tmp_path / manifests[1]))
+    assert all(font.glyphs([0x4E00, 0x4E20, 0x4E30]).values())
+
+
+def test_trim_keeps_the_gap_of_full_width_glyphs():
+    assert generate.trim_glyph(["█▌", "▐█"]) == ["█▌$", "▐█$"] # nothing to trim
+    assert generate.trim_glyph([" █ ", "  █"], gap=2) == ["█$$ ", " █$$"]
+    assert generate.trim_glyph(["  ", "  "]) == ["$$", "$$"] # a blank glyph keeps its width
+    full = Generator_figfont({0x41: ["1" * 16] * 16}).ch_filling().font_dic[0x41]
+    assert all(line.endswith("$") for line in generate.trim_glyph(full))
@@ -0,0 +1,87 @@
+"""
+The renderers draw the same text: straight from the glyphs, and from the generated font files.
+"""
+import pytest
+
+import generate
+import render
+
+SCOPE = generate.get_flf_scope_arr()[:300]
+
+
+@pytest.fixture(scope="module")
+def text():
+    # the characters of the character file, not `FLF_SCOPE_ARR` (always in the hot shard)
+    chinese = "".join(chr(scope[0]) for scope in SCOPE[len(generate.FLF_SCOPE_ARR):])
+    return f"Hi, {chinese[:6]}!\n{chinese[-6:]}。 ÄÖ {chr(0x10FFFF)}"
+
+
+@pytest.fixture(scope="module")
+def flf_files(tmp_path_factory):
+    output_dir = tmp_path_factory.mktemp("fonts")
+    bin_dic = generate.generate_bin_dic(SCOPE)
+    names = ["braille_dots", "block_bold_split", "ascii_small"]
+    fig_fonts = generate.Generator_figfont(bin_dic).generate_styles([generate.FONT_STYLES[name] for name in names])
+    flf_files = {}
+    for name, fig_font in zip(names, fig_fonts):
+        flf_files[name] = str(output_dir / f"{name}.flf")
+        generate.generate_flf(flf_files[name], fig_font)
+    return flf_files
+
+
+def test_renderer_matches_flf_font(flf_files, text):
+    for name, flf_file in flf_files.items():
+        expected = render.FlfFont(flf_file).render_text(text, width=float("inf"))
+        renderer = render.Renderer(name, SCOPE)
+        assert renderer.render_text(text, width=float("inf")) == expected, name
+        assert renderer.render_text(text, width=120) == render.FlfFont(flf_file).render_text(text, width=120), name
+        assert list(renderer.render_many([text, text[::-1]])) == [
+            renderer.render_text(text), renderer.render_text(text[::-1])], name
+
+
+def test_text_renderer_is_abstract():
+    with pytest.raises(TypeError):
+        render.TextRenderer()
+
+
+def test_main_keeps_stdout_open(capsys):
+    render.main(["-w", "0", "Hi"])
+    print("still open") # raises `ValueError` if `main()` closed stdout
+    assert capsys.readouterr().out.endswith("still open\n")
+
+
+def test_sharded_font_falls_back_to_the_cold_shards(flf_files, text, tmp_path):
+    bin_dic = generate.generate_bin_dic(SCOPE)
+    hot_codes = generate.read_hot_codes([text[:6]])
+    manifest_file = generate.build_shards(bin_dic, "braille_dots", hot_codes, cold_size=100, output_dir=str(tmp_path))
+    font = render.ShardedFont(manifest_file)
+    assert font.render_text(text[:6]) == render.FlfFont(flf_files["braille_dots"]).render_text(text[:6])
+    assert font.loaded_files() == [generate.OUTPUT_PREFIX + "braille_dots-hot.flf"]
+    expected = render.FlfFont(flf_files["braille_dots"]).render_text(text, width=float("inf"))
+    assert font.render_text(text, width=float("inf")) == expected # the characters in the cold shards
+    assert len(font.loaded_files()) > 1
+    assert font.glyphs([0x10FFFF]) == {0x10FFFF: None}
+
+
+def test_mapped_font_matches_flf_font(flf_files, text):
+    for name, flf_file in flf_files.items():
+        expected = render.FlfFont(flf_file).render_text(text, width=120)
+        assert render.MappedFlfFont(flf_file).render_text(text, width=120) == expected, name
+    assert not [file for file in flf_files.values() if generate.FlfIndex.load(file) is not None] # nothing written by default
+
+
+def test_mapped_font_uses_a_fresh_index(flf_files, text, tmp_path):
+    flf_file = str(tmp_path / "braille_dots.flf")
+    with open(flf_files["braille_dots"], "rb") as f, open(flf_file, "wb") as g: g.write(f.read())
+    expected = render.FlfFont(flf_file).render_text(text)
+    index = generate.index_flf(flf_file)
+    assert generate.FlfIndex.load(flf_file).codes == index.codes
+    font = render.MappedFlfFont(flf_file)
+    assert font.render_text(text) == expected
+    assert all(font.index.find(code) == index.find(code) for code in map(ord, text))
+    with open(flf_file, "ab") as f: f.write(b"\n") # the index is stale
+    assert generate.FlfIndex.load(flf_file) is None
+    assert render.MappedFlfFont(flf_file).render_text(text) == expected
+    assert generate.FlfIndex.load(flf_file) is None
+    render.MappedFlfFont(flf_file, save_index=True)
+    assert generate.FlfIndex.load(flf_file) is not None
@@ -0,0 +1,77 @@
+"""
+The render server answers the requests in order, from its cache when it can, over a socket too.
+"""
+import asyncio
+import json
+import socket
+import threading
+import time
+
+import pytest
+
+import render_server
+from render_server import RenderServer, RenderClient
+
+
+@pytest.fixture(scope="module")
+def server(tmp_path_factory):
+    # no generated fonts in the font directory, the styles are rendered from unifont
+    return RenderServer(["braille_dots", "ascii_small"], str(tmp_path_factory.mktemp("fonts")))
+
+
+def test_render_requests(server):
+    expected = server.fonts["braille_dots"].render_text("你好", width=40)
+    assert server.render({"id": 1, "text": "你好", "width": 40}) == {"id": 1, "ok": True, "text": expected}
+    assert server.render({"id": 2, "text": "你好", "width": 40})["text"] == expected # from the cache
+    assert server.render({"text": "Hi", "style": "ascii_small", "width": 0})["text"] == \
+        server.fonts["ascii_small"].render_text("Hi", width=float("inf"))
+    assert server.render({"op": "styles"}) == {"id": None, "ok": True, "styles": ["braille_dots", "ascii_small"],
+                                               "default": "braille_dots"}
+    for request in [{"id": 3, "text": "Hi", "style": "block"}, {"id": 4}, {"id": 5, "op": "stop"}, ["not", "a", "dict"]]:
+        response = server.render(request)
+        assert response["ok"] is False and response["id"] == (request.get("id") if isinstance(request, dict) else None)
+    metrics = server.render({"op": "metrics"})["metrics"]
+    assert metrics["errors"] == 4 and metrics["cache_hit_rate"] == pytest.approx(1 / 3)
+
+
+@pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="Unix sockets only")
+def test_client_over_a_socket(server, tmp_path):
+    address = str(tmp_path / "render.sock")
+    loop_task = {}
+    def serve():
+        async def run():
+            loop_task["loop"], loop_task["task"] = asyncio.get_running_loop(), asyncio.current_task()
+            await server.serve(address)
+        try:
+            asyncio.run(run())
+        except asyncio.CancelledError:
+            pass
+    thread = threading.Thread(target=serve)
+    thread.start()
+    try:
+        for _ in range(500):
+            if(tmp_path.joinpath("render.sock").exists()): break
+            time.sleep(0.01)
+        texts = ["你好", "Hi", "", "你好 Hi"]
+        with RenderClient(address, timeout=10) as client:
+            assert client.styles() == ["braille_dots", "ascii_small"]
+            assert list(client.iter_render(texts * 2, batch_size=3)) == \
+                [server.fonts["braille_dots"].render_text(text) for text in texts * 2]
+            assert client.render("Hi", "ascii_small", width=float("inf")) == \
+                server.fonts["ascii_small"].render_text("Hi", width=float("inf"))
+            with pytest.raises(ValueError, match="not loaded"):
+                client.render("Hi", "block")
+            client._file.write(b"{not json\n")
+            client._file.flush()
+            assert json.loads(client._file.readline())["ok"] is False
+            assert client.metrics()["requests"] > 0 # still served after the invalid line
+    finally:
+        loop_task["loop"].call_soon_threadsafe(loop_task["task"].cancel)
+        thread.join(10)
+    assert not thread.is_alive() and not tmp_path.joinpath("render.sock").exists()
+
+
+def test_parse_address():
+    assert render_server.parse_address("127.0.0.1:8765") == ("127.0.0.1", 8765)
+    assert render_server.parse_address(":8765") == ("127.0.0.1", 8765)
+    assert render_server.parse_address(".cache/render.sock") == ".cache/render.sock"